@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+"""Entry point for `python path/to/this/add-on ...`, see cli.py."""
+
+import importlib
+import os
+import sys
+
+if not __package__:
+    # Run as a directory: sys.path[0] is the add-on folder itself, so make
+    # its parent importable and load the folder as a package, which lets
+    # the relative imports in the other modules work.
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[0] = os.path.dirname(here)
+    __package__ = os.path.basename(here)
+    importlib.import_module(__package__)
+
+try:
+    cli = importlib.import_module(".cli", __package__)
+except ImportError as e:
+    sys.exit(f"error: {e}; the command line needs the 'anki' package (pip install anki)")
+sys.exit(cli.main())
@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parse-once file analysis for CSV File Import+.
+
+A single dialog session asks the same questions about the selected file over
+and over (status refresh, delimiter lookup, Quick Import, handoff to Anki's
+importer). FileAnalysis answers them from one bounded read of the file's
+head (plus two small samples for delimiter detection), and AnalysisCache
+hands the same object back until the file changes on disk. Rows are
+streamed from disk through an incremental decoder; compressed files and
+zip members (see sources.py) are decompressed on the fly.
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from . import rowcount, sources
+from .dialect import Dialect, detect_dialect
+
+
+DIRECTIVE_RE = re.compile(r"^\s*#\s*([A-Za-z0-9_\-]+)\s*:\s*(.+?)\s*$")
+_LINE_END_RE = re.compile(r"\r\n|\r|\n")
+# Bytes read from the middle and the end of the file for dialect detection
+DIALECT_SAMPLE_BYTES = 8 * 1024
+SAMPLE_SIZE = 64 * 1024
+PREFIX_BYTES = 64 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+ROW_INDEX_STEP = 1000
+
+DEFAULT_ENCODINGS = ("utf-8", "utf-8-sig", "utf-16", "cp1252", "latin-1")
+# (BOM, encoding, candidate name that enables it)
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig", "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le", "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16-be", "utf-16"),
+)
+
+
+def _utf16_without_bom(prefix: bytes) -> str | None:
+    """Guess UTF-16 byte order from NUL bytes in mostly-ASCII text."""
+    sample = prefix[:4096]
+    if len(sample) < 4:
+        return None
+    even_nuls = sample[0::2].count(0) / len(sample[0::2])
+    odd_nuls = sample[1::2].count(0) / len(sample[1::2])
+    if odd_nuls > 0.3 and even_nuls < 0.05:
+        return "utf-16-le"
+    if even_nuls > 0.3 and odd_nuls < 0.05:
+        return "utf-16-be"
+    return None
+
+
+def detect_encoding(prefix: bytes, candidates=DEFAULT_ENCODINGS) -> tuple[str, int]:
+    """Pick an encoding from a bounded byte prefix; returns (encoding, BOM length).
+
+    A BOM decides outright, then the NUL-byte pattern of BOM-less UTF-16
+    (which every 8-bit candidate, utf-8 included, would decode without
+    errors). Otherwise the candidates are tried in order and the first one
+    that decodes the prefix without errors wins; latin-1 is the final
+    fallback since it accepts any byte.
+    """
+    candidates = [c.lower() for c in candidates]
+    for bom, enc, name in BOMS:
+        if prefix.startswith(bom) and name in candidates:
+            return enc, len(bom)
+    if "utf-16" in candidates:
+        guess = _utf16_without_bom(prefix)
+        if guess:
+            return guess, 0
+    for enc in candidates:
+        if enc in ("utf-8-sig", "utf-16"):
+            continue  # only meaningful with a BOM, or handled above
+        try:
+            codecs.getincrementaldecoder(enc)().decode(prefix, final=False)
+        except (LookupError, UnicodeDecodeError):
+            continue
+        return enc, 0
+    return "latin-1", 0
+
+
+def forced_encoding(prefix: bytes, encoding: str) -> tuple[str, int]:
+    """Like detect_encoding, but always settles on the given encoding."""
+    encoding = encoding.lower()
+    enc, bom = detect_encoding(prefix, [encoding])
+    if enc == "latin-1" and encoding not in ("latin-1", "latin1", "iso-8859-1"):
+        # Honour the request even if the prefix does not decode cleanly
+        enc = "utf-16-le" if encoding == "utf-16" else encoding
+        bom = 0
+    return enc, bom
+
+
+def codec_for(encoding: str) -> str:
+    """Codec that decodes the bytes after the BOM."""
+    return "utf-8" if encoding == "utf-8-sig" else encoding
+
+
+def is_ascii_compatible(codec: str) -> bool:
+    """True if newline, quote and delimiter bytes mean the same as in ASCII."""
+    probe = '\n\r",;\t|#'
+    try:
+        return probe.encode(codec) == probe.encode("ascii")
+    except (LookupError, UnicodeError):
+        return False
+
+
+def scan_directives(text: str) -> tuple[dict, int]:
+    """Parse leading #key:value lines in one pass.
+
+    Returns the directives and the offset of the first data line, i.e. the
+    first line that is neither blank nor a comment/directive.
+    """
+    directives = {}
+    pos = 0
+    end_of_text = len(text)
+    while pos < end_of_text:
+        m = _LINE_END_RE.search(text, pos)
+        end = m.end() if m else end_of_text
+        line = text[pos:end]
+        stripped = line.strip()
+        if stripped:
+            if not stripped.startswith("#"):
+                break
+            m = DIRECTIVE_RE.match(line)
+            if m:
+                directives[m.group(1).lower()] = m.group(2)
+        pos = end
+    return directives, pos
+
+
+SEPARATOR_NAMES = {
+    "comma": ",",
+    "semicolon": ";",
+    "tab": "\t",
+    "space": " ",
+    "pipe": "|",
+    "colon": ":",
+}
+_TRUE = ("true", "yes", "1", "on")
+_FALSE = ("false", "no", "0", "off")
+
+
+def parse_separator(value: str | None) -> str | None:
+    """#separator: a name (comma, tab, ...) or the character itself."""
+    if not value:
+        return None
+    named = SEPARATOR_NAMES.get(value.strip().lower())
+    if named:
+        return named
+    return value if len(value) == 1 else None
+
+
+def parse_bool(value: str | None) -> bool | None:
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    return None
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw stream over file[start:end]; tell()/seek() stay absolute."""
+
+    def __init__(self, path: str, start: int, end: int):
+        self._f = sources.open_binary(path, buffering=0)
+        self._f.seek(start)
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._f.tell()
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        return self._f.seek(pos, whence)
+
+    def readinto(self, b):
+        n = min(len(b), self._end - self._f.tell())
+        if n <= 0:
+            return 0
+        return self._f.readinto(memoryview(b)[:n])
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+class RowIndex:
+    """Byte offsets of every `step`-th row start, so any row can be reached
+    by seeking to the nearest indexed row and parsing at most `step` rows."""
+
+    def __init__(self, offsets: list, rows: int, step: int):
+        self.offsets = offsets
+        self.rows = rows
+        self.step = step
+
+    def locate(self, row: int) -> tuple[int, int]:
+        """(byte offset to start parsing at, rows to skip from there)."""
+        return self.offsets[row // self.step], row % self.step
+
+
+class FileAnalysis:
+    """Everything the dialog derives from one file, computed at most once.
+
+    File-level data (encoding, directives, byte offset of the first data row,
+    a decoded sample) comes from a bounded prefix read on construction; the
+    file itself is never held in memory. Delimiter-dependent data (detected
+    dialect, row count) is computed lazily and memoized per delimiter.
+    """
+
+    def __init__(self, path: str, size: int, mtime: int, encoding: str = "auto",
+                 candidates=DEFAULT_ENCODINGS):
+        self.path = path
+        self.size = size  # on disk, i.e. compressed
+        self.mtime = mtime
+        self.compressed = sources.is_compressed(path)
+        with sources.open_binary(path) as f:
+            text, offset, bom = self._read_head(f, encoding, candidates)
+            declared = self.directives.get("encoding")
+            if encoding == "auto" and declared:
+                # An #encoding directive overrides detection
+                try:
+                    redo = codec_for(declared.lower()) != self.codec
+                    codecs.lookup(declared)
+                except LookupError:
+                    redo = False
+                if redo:
+                    f.seek(0)
+                    text, offset, bom = self._read_head(f, declared, candidates)
+        self.empty = not text.strip()
+        self.bom_length = bom
+        self.data_byte_offset = bom + len(text[:offset].encode(self.codec, errors="replace"))
+        self.sample = text[offset:offset + SAMPLE_SIZE]
+        # Old Mac line endings defeat the byte-level row counter
+        self.cr_only = "\r" in self.sample and "\n" not in self.sample
+        self._has_data = offset < len(text)
+        self.data_byte_end = self._trimmed_end() if self._has_data else self.data_byte_offset
+        self._dialect = None
+        self._row_counts = {}
+        self._row_estimates = {}
+        self._row_indexes = {}
+
+    def _read_head(self, f, encoding: str, candidates):
+        """Decode the prefix and scan the directive block; sets encoding,
+        codec and directives, returns (text, data offset in text, BOM length)."""
+        prefix = f.read(PREFIX_BYTES)
+        if encoding == "auto":
+            self.encoding, bom = detect_encoding(prefix, candidates)
+        else:
+            self.encoding, bom = forced_encoding(prefix, encoding)
+        self.codec = codec_for(self.encoding)
+        self.ascii_compatible = is_ascii_compatible(self.codec)
+        decoder = codecs.getincrementaldecoder(self.codec)(errors="replace")
+        at_eof = len(prefix) < PREFIX_BYTES
+        text = decoder.decode(prefix[bom:], final=at_eof)
+        while True:
+            self.directives, offset = scan_directives(text)
+            if offset < len(text) or at_eof:
+                break
+            # Directive block longer than the prefix
+            more = f.read(PREFIX_BYTES)
+            at_eof = len(more) < PREFIX_BYTES
+            text += decoder.decode(more, final=at_eof)
+        return text, offset, bom
+
+    def _trimmed_end(self) -> int:
+        """Byte offset where the data ends once trailing whitespace is cut
+        (the old code .strip()ped the whole decoded file)."""
+        if self.compressed:
+            # The decompressed size is unknown; read to the end instead
+            return sys.maxsize
+        if self.ascii_compatible:
+            mm = rowcount.open_mmap(self.path)
+            if mm is None:
+                return self.data_byte_offset
+            with mm:
+                return rowcount.data_end(mm, self.data_byte_offset)
+        # Multi-byte code units: decode an aligned tail instead
+        tail_len = min(4096, self.size - self.data_byte_offset)
+        tail_len -= tail_len % 4
+        with open(self.path, "rb") as f:
+            f.seek(self.size - tail_len)
+            tail = f.read(tail_len).decode(self.codec, errors="replace")
+        trailing = tail[len(tail.rstrip()):]
+        return self.size - len(trailing.encode(self.codec, errors="replace"))
+
+    # -------------------- Directives --------------------
+    # Each one that is present replaces a detection step.
+    @property
+    def directive_delimiter(self) -> str | None:
+        return parse_separator(self.directives.get("separator"))
+
+    @property
+    def directive_header(self) -> bool | None:
+        return parse_bool(self.directives.get("header"))
+
+    @property
+    def directive_html(self) -> bool | None:
+        return parse_bool(self.directives.get("html"))
+
+    @property
+    def declared_rows(self) -> int | None:
+        """#rows: number of data rows, header not included."""
+        try:
+            rows = int(self.directives.get("rows", "").replace(",", "").replace("_", ""))
+        except ValueError:
+            return None
+        return rows if rows >= 0 else None
+
+    @property
+    def directive_deck(self) -> str | None:
+        return (self.directives.get("deck") or "").strip() or None
+
+    @property
+    def directive_tags(self) -> list:
+        return (self.directives.get("tags") or "").split()
+
+    def directive_columns(self, delimiter: str) -> list | None:
+        """#columns: column names, separated like the data."""
+        value = self.directives.get("columns")
+        if not value:
+            return None
+        names = next(csv.reader([value], delimiter=delimiter), [])
+        return [n.strip() for n in names] or None
+
+    @property
+    def has_preamble(self) -> bool:
+        """Directive, comment or blank lines precede the data."""
+        return self.data_byte_offset > self.bom_length
+
+    @property
+    def byte_countable(self) -> bool:
+        return self.ascii_compatible and not self.cr_only and not self.compressed
+
+    def has_data(self) -> bool:
+        return self._has_data
+
+    def open_text(self, start: int | None = None):
+        """Text stream over the data part, decoded incrementally.
+
+        Every byte is decoded exactly once as the csv parser pulls lines.
+        tell()/seek() positions are absolute byte offsets into the file.
+        """
+        raw = _BoundedReader(self.path, self.data_byte_offset if start is None else start,
+                             self.data_byte_end)
+        return io.TextIOWrapper(
+            io.BufferedReader(raw, READ_BUFFER_SIZE),
+            encoding=self.codec, errors="replace", newline="",
+        )
+
+    def iter_lines(self, start: int | None = None):
+        text = self.open_text(start)
+        # readline (not iteration) keeps text.tell() usable between rows
+        return iter(text.readline, "")
+
+    def dialect_samples(self) -> list:
+        """(text, starts at a record boundary) for the start of the data and,
+        on files big enough to have them, its middle and end; whole lines only."""
+        size = DIALECT_SAMPLE_BYTES
+        head = self.sample[:size]
+        if len(self.sample) > size:
+            head = head[:head.rfind("\n") + 1] or head
+        samples = [(head, True)]
+        data_end = self.data_byte_end
+        if self.compressed or data_end - self.data_byte_offset <= 3 * size:
+            return samples
+        unit = len("\n".encode(self.codec))  # keep UTF-16/32 code units aligned
+        with open(self.path, "rb") as f:
+            for at in ((self.data_byte_offset + data_end - size) // 2, data_end - size):
+                at -= (at - self.bom_length) % unit
+                f.seek(at)
+                text = f.read(size).decode(self.codec, errors="replace")
+                # Drop the partial first line, and the partial last one mid-file
+                text = text[text.find("\n") + 1:]
+                if at + size < data_end:
+                    text = text[:text.rfind("\n") + 1]
+                samples.append((text, False))
+        return samples
+
+    def dialect(self) -> Dialect:
+        """Detected delimiter, header guess and confidence (memoized)."""
+        if self._dialect is None:
+            if self.has_data():
+                self._dialect = detect_dialect(self.dialect_samples())
+            else:
+                self._dialect = Dialect(",", False, 0.0)
+        return self._dialect
+
+    def detected_delimiter(self) -> str:
+        return self.directive_delimiter or self.dialect().delimiter
+
+    def reader(self, delimiter: str):
+        return csv.reader(self.iter_lines(), delimiter=delimiter)
+
+    def tracked_reader(self, delimiter: str, start: int | None = None):
+        """(csv reader, tell) where tell() is the byte offset of the next row."""
+        text = self.open_text(start)
+        return csv.reader(iter(text.readline, ""), delimiter=delimiter), text.tell
+
+    def row_count(self, delimiter: str) -> int:
+        if delimiter not in self._row_counts:
+            if not self.has_data():
+                rows = 0
+            elif self.byte_countable and len(delimiter) == 1:
+                rows = rowcount.count_rows(self.path, self.data_byte_offset, delimiter)
+            else:
+                rows = 0
+                for i, row in enumerate(self.reader(delimiter), 1):
+                    if row:
+                        rows = i  # trailing blank lines are not counted
+            self._row_counts[delimiter] = rows
+        return self._row_counts[delimiter]
+
+    def estimate_rows(self, delimiter: str, threshold_bytes: int,
+                      has_header: bool | None = None) -> tuple[int, bool]:
+        """Return (rows, estimated), header row included like row_count().
+
+        Files whose data part is larger than `threshold_bytes` get an
+        extrapolation from a sample instead of a full count, unless an
+        exact count is already known. `has_header` is the header setting the
+        import uses (default: the #header directive); a #rows directive
+        counts data rows only, so the header is added back to it.
+        """
+        if delimiter in self._row_counts:
+            return self._row_counts[delimiter], False
+        declared = self.declared_rows
+        if declared is not None:
+            if has_header is None:
+                has_header = self.directive_header
+            return declared + (1 if has_header else 0), False
+        if self.compressed and self.size > threshold_bytes:
+            if delimiter not in self._row_estimates:
+                self._row_estimates[delimiter] = self._estimate_compressed(delimiter)
+            return self._row_estimates[delimiter], True
+        if (
+            not self.byte_countable
+            or len(delimiter) != 1
+            or self.size - self.data_byte_offset <= threshold_bytes
+        ):
+            return self.row_count(delimiter), False
+        if delimiter not in self._row_estimates:
+            self._row_estimates[delimiter] = rowcount.estimate_rows(
+                self.path, self.data_byte_offset, delimiter
+            )
+        return self._row_estimates[delimiter], True
+
+    def _estimate_compressed(self, delimiter: str) -> int:
+        """Rows in the first few decompressed MB, scaled by how much of the
+        compressed file they took."""
+        data, fraction = sources.sample(self.path, rowcount.SAMPLE_BYTES)
+        data = data[self.data_byte_offset:]
+        if fraction < 1.0:
+            data = data[:data.rfind(b"\n") + 1]  # whole lines only
+        text = data.decode(self.codec, errors="replace")
+        rows = sum(1 for _ in csv.reader(io.StringIO(text, newline=""), delimiter=delimiter))
+        return round(rows / fraction) if fraction > 0 else rows
+
+    def head_rows(self, delimiter: str, limit: int) -> list:
+        """First `limit` non-empty rows, without parsing the rest of the file."""
+        rows = (r for r in self.reader(delimiter) if any(c.strip() for c in r))
+        return list(itertools.islice(rows, limit))
+
+    def row_index(self, delimiter: str, step: int = ROW_INDEX_STEP,
+                  should_stop=None) -> RowIndex | None:
+        """Sparse, quote-aware index of row starts (memoized per delimiter).
+
+        One full parse; the text stream's tell() is only taken every `step`
+        rows. Returns None if `should_stop()` turns true on the way.
+        """
+        key = (delimiter, step)
+        if key in self._row_indexes:
+            return self._row_indexes[key]
+        offsets = [self.data_byte_offset]
+        rows = 0
+        if self.has_data():
+            with self.open_text() as text:
+                # csv.reader pulls whole lines and never reads ahead, so after
+                # each row tell() is exactly where the next row starts
+                for _ in csv.reader(iter(text.readline, ""), delimiter=delimiter):
+                    rows += 1
+                    if rows % step == 0:
+                        if should_stop and should_stop():
+                            return None
+                        offsets.append(text.tell())
+        index = RowIndex(offsets, rows, step)
+        self._row_indexes[key] = index
+        self._row_counts.setdefault(delimiter, rows)
+        return index
+
+    def rows_at(self, delimiter: str, offset: int, skip: int, count: int) -> list:
+        """`count` rows after skipping `skip` rows from byte offset `offset`."""
+        if not self.has_data():
+            return []
+        with self.open_text(offset) as text:
+            reader = csv.reader(iter(text.readline, ""), delimiter=delimiter)
+            return list(itertools.islice(reader, skip, skip + count))
+
+
+class AnalysisCache:
+    """Small LRU of FileAnalysis objects keyed on (path, size, mtime, encoding).
+
+    `encoding` is either a forced encoding or "auto" plus the candidate list.
+
+    Editing or replacing the file changes its size/mtime and therefore misses
+    the cache; everything else reuses the previous analysis. Safe to share
+    between the GUI thread and the background analysis worker.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, encoding: str = "auto",
+            candidates=DEFAULT_ENCODINGS) -> FileAnalysis | None:
+        if not path:
+            return None
+        try:
+            st = sources.stat(path)
+        except OSError:
+            return None
+        key = (path, st.st_size, st.st_mtime_ns, encoding, tuple(candidates))
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                return analysis
+            analysis = FileAnalysis(path, st.st_size, st.st_mtime_ns, encoding, candidates)
+            self._entries[key] = analysis
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return analysis
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark suite; not loaded by Anki. Run it with `python path/to/this/add-on/bench`."""
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+"""Entry point for `python path/to/this/add-on/bench ...`, see run.py."""
+
+import importlib
+import os
+import sys
+
+if not __package__:
+    # Run as a directory: load the add-on folder as a package and this
+    # folder as its `bench` subpackage, so relative imports work.
+    here = os.path.dirname(os.path.abspath(__file__))
+    addon = os.path.dirname(here)
+    sys.path[0] = os.path.dirname(addon)
+    __package__ = f"{os.path.basename(addon)}.{os.path.basename(here)}"
+    importlib.import_module(__package__)
+
+run = importlib.import_module(".run", __package__)
+sys.exit(run.main())
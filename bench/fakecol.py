@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+A lightweight stand-in for anki.collection.Collection.
+
+It implements just the calls the engine makes, with in-memory data and no
+database, so the benchmarks measure the add-on's own work. Notes are
+counted rather than stored, keeping memory figures about the importer;
+like the real collection, adding a note gives it the next id.
+"""
+
+import random
+from types import SimpleNamespace
+
+from .generate import WORDS, header_names
+
+
+class FakeNote:
+    id = 0
+
+    def __init__(self, notetype):
+        self.mid = notetype["id"]
+        self.fields = [""] * len(notetype["flds"])
+        self.tags = []
+
+
+class FakeModels:
+    def __init__(self, notetypes):
+        self._by_id = {nt["id"]: nt for nt in notetypes}
+        self._names = [SimpleNamespace(id=nt["id"], name=nt["name"]) for nt in notetypes]
+
+    def all_names_and_ids(self):
+        return list(self._names)
+
+    def get(self, notetype_id):
+        return self._by_id.get(notetype_id)
+
+
+class FakeDecks:
+    def __init__(self):
+        self._ids = {"Default": 1}
+
+    def id(self, name):
+        return self._ids.setdefault(name, len(self._ids) + 1)
+
+    def all_names_and_ids(self):
+        return [SimpleNamespace(id=i, name=n) for n, i in self._ids.items()]
+
+
+class FakeDB:
+    def all(self, *_args):
+        return []
+
+
+class FakeCollection:
+    def __init__(self, notetype_count: int = 10, seed: int = 0):
+        self.models = FakeModels(make_notetypes(notetype_count, seed))
+        self.decks = FakeDecks()
+        self.db = FakeDB()
+        self.added = 0
+        self.updated = 0
+        self._next_id = 1
+        self.transactions = 0
+
+    def new_note(self, notetype):
+        return FakeNote(notetype)
+
+    def _assign_id(self, note):
+        note.id = self._next_id
+        self._next_id += 1
+
+    def add_notes(self, requests):
+        for request in requests:
+            self._assign_id(request.note)
+        self.added += len(requests)
+        self.transactions += 1
+
+    def add_note(self, note, deck_id):
+        self._assign_id(note)
+        self.added += 1
+        self.transactions += 1
+
+    def update_notes(self, notes):
+        self.updated += len(notes)
+        self.transactions += 1
+
+    def get_note(self, note_id):
+        raise KeyError(note_id)
+
+
+def make_notetypes(count: int, seed: int = 0) -> list:
+    """`count` note types; the first few look like Anki's stock ones."""
+    rnd = random.Random(seed)
+    stock = [
+        ("Basic", ["Front", "Back"]),
+        ("Basic (and reversed card)", ["Front", "Back"]),
+        ("Cloze", ["Text", "Back Extra"]),
+        ("Vocab", header_names(3)),
+    ]
+    notetypes = []
+    for i in range(count):
+        if i < len(stock):
+            name, fields = stock[i]
+        else:
+            name = f"Note type {i}"
+            fields = [
+                f"{rnd.choice(WORDS).title()} {j + 1}" for j in range(rnd.randint(2, 12))
+            ]
+        notetypes.append({
+            "id": 1000 + i,
+            "name": name,
+            "flds": [{"name": f} for f in fields],
+        })
+    return notetypes
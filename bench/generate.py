@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic CSV files for the benchmarks.
+
+Output is fully determined by the arguments (including `seed`), so every
+run and every machine measures the same bytes.
+"""
+
+import csv
+import random
+from dataclasses import dataclass
+
+WORDS = (
+    "apple river stone cloud maison école über straße 東京 数据 lamp orbit "
+    "quiet velvet ember harbor cedar prism tundra basil fjord granite"
+).split()
+
+
+@dataclass
+class CsvSpec:
+    rows: int = 1000
+    cols: int = 3
+    delimiter: str = ","
+    quoting: str = "minimal"  # "minimal", "all" or "none"
+    multiline: float = 0.0  # fraction of rows with a line break inside a field
+    header: bool = False
+    directive: str | None = None  # e.g. "Basic" -> "#notetype:Basic"
+    encoding: str = "utf-8"
+    tags: bool = False  # extra last column of tags
+    seed: int = 0
+
+
+def header_names(cols: int) -> list:
+    base = ["Front", "Back", "Example", "Notes", "Source", "Extra"]
+    return [base[i] if i < len(base) else f"Field {i + 1}" for i in range(cols)]
+
+
+def make_rows(spec: CsvSpec):
+    rnd = random.Random(spec.seed)
+    for _ in range(spec.rows):
+        row = [" ".join(rnd.choices(WORDS, k=rnd.randint(1, 6))) for _ in range(spec.cols)]
+        if spec.multiline and rnd.random() < spec.multiline:
+            row[-1] += "\n" + " ".join(rnd.choices(WORDS, k=3))
+        if spec.tags:
+            row.append(" ".join(rnd.choices(WORDS[:6], k=2)))
+        yield row
+
+
+def write_csv(path: str, spec: CsvSpec) -> str:
+    quoting = {
+        "minimal": csv.QUOTE_MINIMAL,
+        "all": csv.QUOTE_ALL,
+        "none": csv.QUOTE_NONE,
+    }[spec.quoting]
+    # Words a legacy encoding cannot hold are written as "?"
+    with open(path, "w", encoding=spec.encoding, errors="replace", newline="") as f:
+        if spec.directive:
+            f.write(f"#notetype:{spec.directive}\n")
+        writer = csv.writer(
+            f, delimiter=spec.delimiter, quoting=quoting, escapechar="\\", lineterminator="\n"
+        )
+        if spec.header:
+            writer.writerow(header_names(spec.cols) + (["Tags"] if spec.tags else []))
+        writer.writerows(make_rows(spec))
+    return path
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks for detection, note-type scoring and import throughput.
+
+    python path/to/this/add-on/bench                 # quick set, compare to baselines
+    python path/to/this/add-on/bench --full          # adds the 1M-row scenarios
+    python path/to/this/add-on/bench --update-baselines
+
+Each scenario writes a synthetic CSV (see generate.py) and times these
+stages against a FakeCollection:
+
+    analyze           encoding/directive prefix read + dialect detection
+    detect_dialect    delimiter/header detection on already-read samples
+    count_rows        exact row count
+    notetype_index    building the note-type index (cold)
+    pick_note_type    auto-pick with a warm index
+    import            full Quick Import (rows -> notes -> add_notes)
+
+Times are the best of --repeat runs; peak memory is measured in a separate
+run under tracemalloc. Baselines are per machine: record them on the
+machine that runs the comparison. The `anki` package is not needed: the
+import stage uses the default Add anyway policy, which builds no
+duplicate index.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ..analysis import DEFAULT_ENCODINGS, FileAnalysis
+from ..dialect import detect_dialect
+from ..engine import ImportOptions, import_plan, pick_note_type, plan_import
+from ..notetypes import note_type_index
+from .fakecol import FakeCollection
+from .generate import CsvSpec, write_csv
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+
+# name -> (CsvSpec, note type count)
+SCENARIOS = {
+    "1k-comma": (CsvSpec(rows=1_000), 10),
+    "100k-comma": (CsvSpec(rows=100_000), 10),
+    "100k-tab-header-tags": (CsvSpec(rows=100_000, delimiter="\t", header=True, tags=True), 10),
+    "100k-semicolon-quoted-multiline": (
+        CsvSpec(rows=100_000, delimiter=";", quoting="all", multiline=0.1, cols=4), 10,
+    ),
+    "100k-pipe-directive-cp1252": (
+        CsvSpec(rows=100_000, delimiter="|", directive="Basic", cols=2, encoding="cp1252"), 10,
+    ),
+    "100k-utf16-header": (CsvSpec(rows=100_000, header=True, encoding="utf-16"), 10),
+    "10k-comma-500-notetypes": (CsvSpec(rows=10_000, header=True), 500),
+}
+FULL_SCENARIOS = {
+    "1m-comma": (CsvSpec(rows=1_000_000), 10),
+    "1m-comma-quoted-multiline": (CsvSpec(rows=1_000_000, quoting="all", multiline=0.05), 10),
+}
+
+
+def fresh_analysis(path: str) -> FileAnalysis:
+    st = os.stat(path)
+    return FileAnalysis(path, st.st_size, st.st_mtime_ns, "auto", DEFAULT_ENCODINGS)
+
+
+def stages(path: str, spec: CsvSpec, notetypes: int):
+    """(stage name, setup() -> state, fn(state) -> rows handled or None)."""
+    options = ImportOptions(has_header=spec.header)
+
+    def analyzed():
+        analysis = fresh_analysis(path)
+        return analysis, analysis.detected_delimiter()
+
+    def analyze(_):
+        analysis = fresh_analysis(path)
+        analysis.detected_delimiter()
+
+    def count_rows(state):
+        analysis, delimiter = state
+        return analysis.row_count(delimiter)
+
+    def samples():
+        return fresh_analysis(path).dialect_samples()
+
+    def detect(state):
+        detect_dialect(state)
+
+    def cold_index(_):
+        col = FakeCollection(notetypes)
+        note_type_index.invalidate()
+        note_type_index.schema(col)
+
+    def warm_pick_setup():
+        col = FakeCollection(notetypes)
+        note_type_index.invalidate()
+        note_type_index.schema(col)
+        return (col,) + analyzed()
+
+    def pick(state):
+        col, analysis, delimiter = state
+        pick_note_type(col, analysis, delimiter, spec.header)
+
+    def import_setup():
+        col = FakeCollection(notetypes)
+        note_type_index.invalidate()
+        return col, analyzed()[0]
+
+    def run_import(state):
+        col, analysis = state
+        plan = plan_import(col, analysis, options)
+        return import_plan(col, plan, col.decks.id("Bench"), options).rows_seen
+
+    return [
+        ("analyze", lambda: None, analyze),
+        ("detect_dialect", samples, detect),
+        ("count_rows", analyzed, count_rows),
+        ("notetype_index", lambda: None, cold_index),
+        ("pick_note_type", warm_pick_setup, pick),
+        ("import", import_setup, run_import),
+    ]
+
+
+def measure(setup, fn, repeat: int, memory: bool) -> dict:
+    best = None
+    rows = None
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        rows = fn(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    out = {"seconds": round(best, 6)}
+    if rows:
+        out["rows_per_sec"] = round(rows / max(best, 1e-9))
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        try:
+            fn(state)
+            out["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    return out
+
+
+def run_scenarios(scenarios: dict, repeat: int, memory: bool, only=None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="csv_import_bench_") as tmp:
+        for name, (spec, notetypes) in scenarios.items():
+            if only and only not in name:
+                continue
+            path = write_csv(os.path.join(tmp, f"{name}.csv"), spec)
+            size_mb = os.path.getsize(path) / 2**20
+            print(f"{name} ({spec.rows:,} rows, {size_mb:.1f} MB)")
+            for stage, setup, fn in stages(path, spec, notetypes):
+                result = measure(setup, fn, repeat, memory)
+                results[f"{name}/{stage}"] = result
+                print("  " + format_result(stage, result))
+    return results
+
+
+def format_result(stage: str, result: dict) -> str:
+    line = f"{stage:<16} {result['seconds'] * 1000:>10.2f} ms"
+    if "rows_per_sec" in result:
+        line += f" {result['rows_per_sec']:>12,} rows/s"
+    if "peak_mb" in result:
+        line += f" {result['peak_mb']:>9.2f} MB peak"
+    return line
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINES_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list:
+    """Keys whose time grew by more than `tolerance` over the baseline."""
+    regressions = []
+    for key, result in results.items():
+        base = baselines.get(key)
+        if not base:
+            continue
+        # Sub-millisecond stages are too noisy to gate on a ratio alone
+        limit = max(base["seconds"] * (1 + tolerance), base["seconds"] + 0.001)
+        if result["seconds"] > limit:
+            regressions.append((key, base["seconds"], result["seconds"]))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CSV File Import+ benchmarks")
+    parser.add_argument("--full", action="store_true", help="include the 1M-row scenarios")
+    parser.add_argument("--only", help="run scenarios whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="store these results as the new baselines")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = dict(SCENARIOS)
+    if args.full:
+        scenarios.update(FULL_SCENARIOS)
+    results = run_scenarios(scenarios, max(args.repeat, 1), not args.no_memory, args.only)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baselines = load_baselines()
+    if args.update_baselines:
+        baselines.update(results)
+        with open(BASELINES_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaselines written to {BASELINES_PATH}")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for key, base, now in regressions:
+            print(f"  {key}: {base * 1000:.2f} ms -> {now * 1000:.2f} ms (+{now / base - 1:.0%})")
+        return 1
+    if baselines:
+        print(f"\nNo regressions beyond {args.tolerance:.0%}.")
+    return 0
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cached deck and note-type lists for the dialog's combo boxes.
+
+all_names_and_ids() walks every deck (or note type) in the backend; on
+collections with thousands of decks that alone makes the dialog lag on
+open. Catalog keeps both lists until a change hook says they are stale,
+and decks the add-on creates itself are inserted in place. A refetch
+returns a new list object, so callers can tell by identity whether the
+combo they filled from it is out of date.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import NamedTuple
+
+
+class NameId(NamedTuple):
+    name: str
+    id: int
+
+
+def deck_sort_key(name: str) -> list:
+    # The order of all_names_and_ids(): parents first, case-insensitive
+    return [part.lower() for part in name.split("::")]
+
+
+class Catalog:
+    def __init__(self):
+        self._decks = None
+        self._notetypes = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_args):
+        self._decks = None
+        self._notetypes = None
+
+    def invalidate_decks(self, *_args):
+        self._decks = None
+
+    def decks(self, col) -> list:
+        decks = self._decks
+        if decks is None:
+            with self._lock:
+                if self._decks is None:
+                    self._decks = [NameId(d.name, d.id) for d in col.decks.all_names_and_ids()]
+                decks = self._decks
+        return decks
+
+    def notetypes(self, col) -> list:
+        notetypes = self._notetypes
+        if notetypes is None:
+            with self._lock:
+                if self._notetypes is None:
+                    self._notetypes = [
+                        NameId(m.name, m.id) for m in col.models.all_names_and_ids()
+                    ]
+                notetypes = self._notetypes
+        return notetypes
+
+    def add_deck(self, name: str, deck_id: int) -> int | None:
+        """Insert a deck created by the add-on; returns its position, or
+        None if the list is not loaded or already has the deck. Creating
+        `A::B::C` also creates a missing `A::B`; then the list is dropped
+        instead, to be fetched again with every new parent."""
+        with self._lock:
+            decks = self._decks
+            if decks is None or any(d.id == deck_id for d in decks):
+                return None
+            if "::" in name:
+                parent = deck_sort_key(name.rsplit("::", 1)[0])
+                if not any(deck_sort_key(d.name) == parent for d in decks):
+                    self._decks = None
+                    return None
+            pos = bisect_left(decks, deck_sort_key(name), key=lambda d: deck_sort_key(d.name))
+            decks.insert(pos, NameId(name, deck_id))
+            return pos
+
+    def on_operation_did_execute(self, changes, handler):
+        if getattr(changes, "deck", False):
+            self.invalidate_decks()
+        if getattr(changes, "notetype", False):
+            self._notetypes = None
+
+
+catalog = Catalog()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Quick Import from the command line, straight into a collection file.
+
+    python path/to/this/add-on collection.anki2 cards.csv --deck "Vocab"
+    python path/to/this/add-on collection.anki2 lessons/*.csv --deck "Course" --header
+
+Uses the same detection and import engine as the dialog. Requires the
+`anki` Python package (pip install anki), and the collection must not be
+open in Anki at the same time. Several files (or --subdecks) import each
+file into <deck>::<file name>. An import that fails is rolled back as a
+whole; an interrupted one (Ctrl-C) keeps what it committed for --resume.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import anki.lang
+from anki.collection import Collection
+
+from . import sources
+from .analysis import DEFAULT_ENCODINGS
+from .duplicates import ADD, POLICIES
+from .engine import (
+    ImportOptions, delimiter_name, find_notetype_index, import_into_subdecks, import_plan,
+    open_analysis, plan_import, plan_imports, rollback_journal, undoable,
+)
+from .importer import DEFAULT_BATCH_SIZE
+from .journal import journal
+from .profiling import Profile
+from .rowcount import format_row_count
+
+
+DEFAULT_DECK = "Default"
+DELIMITERS = {
+    "auto": None,
+    "comma": ",",
+    "tab": "\t",
+    "semicolon": ";",
+    "pipe": "|",
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Import CSV files into an Anki collection without opening Anki.",
+    )
+    parser.add_argument("collection", help="path to the .anki2 collection file")
+    parser.add_argument("files", nargs="+",
+                        help="CSV file(s) to import; .gz, .bz2 and .xz are read compressed, "
+                             "and every CSV in a .zip is imported on its own")
+    parser.add_argument("--deck",
+                        help="target deck, created if missing "
+                             "(default: the file's #deck directive, else Default)")
+    parser.add_argument("--subdecks", action="store_true",
+                        help="import each file into <deck>::<file name> (implied by several files)")
+    parser.add_argument("--notetype",
+                        help="note type name (default: #notetype directive, else auto-detect)")
+    parser.add_argument("--delimiter", choices=sorted(DELIMITERS), default="auto")
+    parser.add_argument("--header", action="store_true", help="first row is a header")
+    parser.add_argument("--mapping",
+                        help='column mapping, e.g. \'Front=2, Back=1|br, tags=3\' '
+                             "(default: #mapping directive, else columns in field order)")
+    parser.add_argument("--encoding", default="auto",
+                        help=f"file encoding (default: detect from {', '.join(DEFAULT_ENCODINGS)})")
+    parser.add_argument("--duplicates", choices=[p for _, p in POLICIES], default=ADD,
+                        help="what to do with rows whose first field already exists")
+    parser.add_argument("--dedupe-in-deck", action="store_true",
+                        help="only treat notes in the target deck as duplicates")
+    parser.add_argument("--key-field", type=int, default=1,
+                        help="with --duplicates sync: field (1-based) that identifies a note")
+    parser.add_argument("--flag-missing", action="store_true",
+                        help="with --duplicates sync: tag notes missing from the file "
+                             "as missing-from-csv")
+    parser.add_argument("--no-media", action="store_true",
+                        help="do not copy files referenced by <img> or [sound:] "
+                             "from the CSV's folder into the collection")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="notes per transaction")
+    parser.add_argument("--workers", type=int,
+                        help="parser processes for files over 64 MB "
+                             "(default: one per core; 1: none)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted import of the file "
+                             "after its last committed batch")
+    parser.add_argument("--profile", action="store_true",
+                        help="print a per-phase timing and peak memory breakdown")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    return parser
+
+
+def progress_printer(total: int, quiet: bool):
+    if quiet or not sys.stderr.isatty():
+        return None
+    started = time.monotonic()
+
+    def report(done):
+        rate = done / max(time.monotonic() - started, 1e-6)
+        sys.stderr.write(f"\r{done:,} / {total:,} rows • {rate:,.0f} rows/s ")
+        sys.stderr.flush()
+
+    return report
+
+
+def describe(path: str, deck_name: str, plan, result) -> str:
+    parts = [f"added {result.added}"]
+    if result.updated:
+        parts.append(f"updated {result.updated}")
+    if result.skipped_empty:
+        parts.append(f"skipped empty {result.skipped_empty}")
+    if result.unchanged:
+        parts.append(f"unchanged {result.unchanged}")
+    if result.skipped_duplicates:
+        parts.append(f"skipped duplicates {result.skipped_duplicates}")
+    if result.missing:
+        parts.append(f"tagged missing {result.missing}")
+    media = result.media
+    if media and (media.copied or media.present or media.missing or media.conflicts):
+        parts.append(
+            f"media copied {media.copied}/present {media.present}/missing {media.missing}"
+            + (f"/conflicts {media.conflicts}" if media.conflicts else "")
+        )
+    if result.cancelled:
+        parts.append("cancelled")
+    return (
+        f"{os.path.basename(path)} → {deck_name}: {', '.join(parts)} "
+        f"({plan.notetype_name}, {delimiter_name(plan.delimiter)}, "
+        f"{format_row_count(plan.rows, plan.estimated)}, {plan.analysis.encoding})"
+    )
+
+
+def run(col, args, profile=None) -> list:
+    """Import args.files into `col`; returns [(plan, deck name, ImportResult)]."""
+    options = ImportOptions(
+        delimiter=DELIMITERS[args.delimiter],
+        has_header=args.header,
+        encoding=args.encoding,
+        policy=args.duplicates,
+        dedupe_in_deck=args.dedupe_in_deck,
+        key_field=max(args.key_field - 1, 0),
+        flag_missing=args.flag_missing,
+        mapping=args.mapping,
+        import_media=not args.no_media,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+    if args.workers is not None and args.workers < 2:
+        options.parallel_min_bytes = None
+    if args.notetype:
+        infos = list(col.models.all_names_and_ids())
+        idx = find_notetype_index(infos, args.notetype)
+        if idx is None:
+            raise Exception(f"Note type not found: {args.notetype}")
+        options.notetype_id = infos[idx].id
+
+    files = sources.expand(args.files)
+    if not files:
+        raise Exception("No CSV files to import.")
+    if args.subdecks or len(files) > 1:
+        parent = args.deck or DEFAULT_DECK
+        col.decks.id(parent)  # creates if missing
+        plans = plan_imports(col, files, options, profile=profile)
+        report = progress_printer(sum(p.rows for p in plans), args.quiet)
+        outcomes, _ = undoable(col, lambda: import_into_subdecks(
+            col, plans, parent, options, progress=report, profile=profile
+        ))
+        return outcomes
+
+    path = files[0]
+    resume = journal.load(path, col) if args.resume else None
+    if args.resume and resume is None:
+        raise Exception(f"Nothing to resume for {path}.")
+    if resume is not None:
+        # Same delimiter, note type, encoding and deck as the interrupted run
+        options.delimiter = resume.delimiter
+        options.notetype_id = resume.notetype_id
+        options.encoding = resume.encoding
+    analysis = open_analysis(path, options, profile=profile)
+    if analysis is None:
+        raise Exception(f"Could not read {path}.")
+    plan = plan_import(col, analysis, options, profile=profile)
+    if resume is not None:
+        deck_name, deck_id = resume.deck or args.deck, resume.deck_id
+        plan.rows = max(plan.rows - resume.row, 0)
+    else:
+        deck_name = args.deck or analysis.directive_deck or DEFAULT_DECK
+        deck_id = col.decks.id(deck_name)  # creates if missing
+    report = progress_printer(plan.rows, args.quiet)
+    result, _ = undoable(
+        col,
+        lambda: import_plan(col, plan, deck_id, options, progress=report, profile=profile,
+                            journal=journal, resume=resume),
+        on_rollback=lambda: rollback_journal(journal, path, resume),
+    )
+    return [(plan, deck_name, result)]
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.collection):
+        print(f"error: collection not found: {args.collection}", file=sys.stderr)
+        return 1
+    started = time.monotonic()
+    profile = Profile("cli_import", track_memory=True) if args.profile else None
+    # Anki's GUI does this on startup; strip_html_media (duplicate checks) needs it
+    anki.lang.set_lang("en")
+    col = Collection(args.collection)
+    try:
+        outcomes = run(col, args, profile)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        col.close()
+        if progress_printer(0, args.quiet):
+            sys.stderr.write("\n")  # end the progress line
+    for plan, deck_name, result in outcomes:
+        print(describe(plan.path, deck_name, plan, result))
+    elapsed = time.monotonic() - started
+    rows = sum(result.rows_seen for _, _, result in outcomes)
+    print(f"{rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):,.0f} rows/s)")
+    if profile is not None:
+        print(f"Timing: {profile.summary()}")
+    return 0
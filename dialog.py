@@ -0,0 +1,1442 @@
+# -*- coding: utf-8 -*-
+
+"""
+The CSV File Import+ dialog and its menu entry.
+
+Widgets collect the options; detection and importing are delegated to
+engine.py, with slow work run in the background.
+"""
+
+from aqt import mw, gui_hooks
+from aqt.qt import (
+    QAbstractItemView, QAction, QCheckBox, QComboBox, QDialog, QFileDialog, QFormLayout,
+    QGroupBox, QHBoxLayout, QHeaderView, QLabel, QLineEdit, QProgressDialog, QPushButton,
+    Qt, QTableView, QTimer, QVBoxLayout, QWidget
+)
+from aqt.operations import QueryOp, on_op_finished
+from aqt.utils import askUser, showInfo, showWarning, tooltip
+from aqt.importing import importFile
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from . import sources
+from .analysis import DEFAULT_ENCODINGS, AnalysisCache
+from .catalog import catalog
+from .duplicates import ADD, POLICIES, SYNC
+from .engine import (
+    DEFAULT_ESTIMATE_THRESHOLD_BYTES, ImportOptions, delimiter_name, find_notetype_index,
+    import_into_subdecks, import_plan, normalize_subdeck_name, pick_note_type, plan_import,
+    plan_imports, rollback_journal, subdeck_name_for, undoable,
+)
+from .handoff import handoff_path, temp_files
+from .journal import journal
+from .mapping import column_layout, compile_mapping
+from .notetypes import note_type_index
+from .parallel import DEFAULT_PARALLEL_MIN_BYTES
+from .preview import PreviewModel
+from .profiling import Profile, phase, write_record
+from .rowcount import format_row_count
+from .watch import FolderWatch
+
+
+PROFILE_KEY_LAST_DIR = "csv_file_import_plus_last_dir"
+# Watch folder, target deck and import settings (see FolderWatcher)
+PROFILE_KEY_WATCH = "csv_file_import_plus_watch"
+DEFAULT_WATCH_INTERVAL_SECONDS = 30
+# Header directives shown in the status line when a file uses them
+FILE_DIRECTIVES = (
+    "separator", "header", "columns", "rows", "encoding", "html", "deck", "tags", "mapping",
+)
+ANALYSIS_DEBOUNCE_MS = 250
+
+
+def get_config() -> dict:
+    try:
+        return mw.addonManager.getConfig(__name__) or {}
+    except Exception:
+        return {}
+
+
+def encoding_candidates() -> tuple:
+    return tuple(get_config().get("encodings") or DEFAULT_ENCODINGS)
+
+
+def estimate_threshold_bytes() -> int:
+    mb = get_config().get("row_estimate_threshold_mb")
+    if mb is None:
+        return DEFAULT_ESTIMATE_THRESHOLD_BYTES
+    return int(mb * 1024 * 1024)
+
+
+def parallel_min_bytes() -> int | None:
+    cfg = get_config()
+    mb = cfg.get("parallel_parse_min_mb", DEFAULT_PARALLEL_MIN_BYTES / (1024 * 1024))
+    return None if mb is None else int(mb * 1024 * 1024)
+
+
+def watch_interval_ms() -> int:
+    seconds = get_config().get("watch_interval_seconds") or DEFAULT_WATCH_INTERVAL_SECONDS
+    return int(max(seconds, 1) * 1000)
+
+
+def new_profile(operation: str, memory: bool = True) -> Profile | None:
+    cfg = get_config()
+    if not cfg.get("profiling", True):
+        return None
+    track_memory = memory and bool(cfg.get("profile_memory", False))
+    return Profile(operation, track_memory=track_memory)
+
+
+def finish_profile(profile: Profile | None, **info) -> str:
+    """Log the profile and return the breakdown line for the result dialog."""
+    if profile is None:
+        return ""
+    profile.info.update(info)
+    profile.finish()
+    write_record(profile)
+    return f"\n\nTiming: {profile.summary()}"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+@dataclass
+class ImportOutcome:
+    """What an import op returns: the engine's result plus the OpChanges of
+    its single undo step, which refresh the affected screens."""
+
+    value: object
+    changes: object
+
+
+def run_import_op(parent, op, on_done, on_failed):
+    """Run an import op (collection -> ImportOutcome) in the background.
+
+    CollectionOp always goes through taskman.with_progress, whose modal
+    "Processing…" window would cover ImportProgressDialog and its Cancel
+    button. A QueryOp without progress runs on the collection executor
+    with no window of its own; the merged changes are then announced the
+    way CollectionOp does it.
+    """
+
+    def success(outcome):
+        try:
+            on_done(outcome)
+        finally:
+            on_op_finished(mw, outcome, None)
+
+    def failure(e):
+        mw.update_undo_actions()  # the rollback may have changed the history
+        on_failed(e)
+
+    QueryOp(parent=parent, op=op, success=success).failure(failure).run_in_background()
+
+
+class ImportProgressDialog(QProgressDialog):
+    """Progress bar with rows/sec, ETA and a Cancel button for Quick Import.
+
+    The import itself runs in the background; Cancel only raises a flag that
+    the importer checks between batches.
+    """
+
+    def __init__(self, total_rows: int, parent=None):
+        super().__init__("Starting import…", "Cancel", 0, max(total_rows, 0), parent)
+        self.setWindowTitle("CSV File Import+")
+        self.setWindowModality(Qt.WindowModality.WindowModal)
+        self.setMinimumDuration(0)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        self.total_rows = total_rows
+        self.started = time.monotonic()
+        self.cancel_event = threading.Event()
+        self.canceled.connect(self.on_cancel)
+
+    def finish(self):
+        """Close and free the dialog: the import dialog it belongs to is
+        reused across imports and would otherwise collect one per run."""
+        self.close()
+        self.deleteLater()
+
+    def on_cancel(self):
+        self.cancel_event.set()
+        self.setLabelText("Cancelling after the current batch…")
+
+    def set_total(self, total_rows: int):
+        self.total_rows = total_rows
+        self.setMaximum(max(total_rows, 0))
+        self.started = time.monotonic()
+
+    def update_rows(self, done: int):
+        if self.cancel_event.is_set():
+            return
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = done / elapsed
+        parts = [f"{done:,} / {self.total_rows:,} rows", f"{rate:,.0f} rows/s"]
+        if rate > 0 and self.total_rows > done:
+            parts.append(f"ETA {format_duration((self.total_rows - done) / rate)}")
+        self.setLabelText(" • ".join(parts))
+        self.setValue(min(done, self.total_rows))
+
+
+class CSVFileImportDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.deck_infos = []
+        self.model_infos = []
+        self.file_path = ""
+        self.file_paths = []
+        self.checkpoint = None
+        self.directive_mapping = None  # mapping_edit text filled in from #mapping
+        self.analysis_cache = AnalysisCache()
+        self._analysis_generation = 0
+        self._analysis_running = False
+        self._analysis_pending = False
+        self._analysis_timer = QTimer(self)
+        self._analysis_timer.setSingleShot(True)
+        self._analysis_timer.setInterval(ANALYSIS_DEBOUNCE_MS)
+        self._analysis_timer.timeout.connect(self.start_analysis)
+        self.setup_ui()
+
+    # -------------------- UI --------------------
+    def setup_ui(self):
+        self.setWindowTitle("CSV File Import+")
+        self.setMinimumSize(720, 680)
+
+        root = QVBoxLayout()
+
+        # Instructions
+        instr = QLabel(
+            "1) Choose a CSV, 2) Adjust options, 3) Pick deck and note type, 4) Import.\n"
+            "Supported delimiters: comma, tab, semicolon, pipe. Directives: #notetype:Basic\n"
+            "Quick Import adds notes directly; Import with Anki dialog opens the standard importer."
+        )
+        instr.setWordWrap(True)
+        root.addWidget(instr)
+
+        # File row
+        file_group = QGroupBox("CSV File")
+        file_form = QFormLayout()
+        file_row = QHBoxLayout()
+        self.file_edit = QLineEdit()
+        self.file_edit.setPlaceholderText("No file selected…")
+        self.file_edit.setReadOnly(True)
+        self.browse_btn = QPushButton("Browse…")
+        self.browse_btn.clicked.connect(self.pick_file)
+        self.folder_btn = QPushButton("Folder…")
+        self.folder_btn.clicked.connect(self.pick_folder)
+        file_row.addWidget(self.file_edit)
+        file_row.addWidget(self.browse_btn)
+        file_row.addWidget(self.folder_btn)
+        self.watch_btn = QPushButton()
+        self.watch_btn.clicked.connect(self.toggle_watch)
+        file_row.addWidget(self.watch_btn)
+        self.update_watch_button()
+        file_form.addRow("", self.wrap_layout(file_row))
+
+        # Header toggle
+        self.header_check = QCheckBox("First row is header")
+        self.header_check.toggled.connect(self.on_content_changed)
+        file_form.addRow("", self.header_check)
+
+        # Media referenced in fields, looked up next to the CSV
+        self.media_check = QCheckBox("Copy images and audio referenced in the CSV")
+        self.media_check.setToolTip(
+            "Files used in <img src=...> or [sound:...] are copied from the CSV's "
+            "folder into the collection's media folder."
+        )
+        self.media_check.setChecked(True)
+        file_form.addRow("", self.media_check)
+
+        file_group.setLayout(file_form)
+        root.addWidget(file_group)
+
+        # Status line
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #21808D; font-weight: 500;")
+        root.addWidget(self.status_label)
+
+        # Preview (rows are parsed on demand as they scroll into view)
+        preview_group = QGroupBox("Preview")
+        preview_layout = QVBoxLayout()
+        self.preview_model = PreviewModel(self)
+        self.preview_view = QTableView()
+        self.preview_view.setModel(self.preview_model)
+        self.preview_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.preview_view.setWordWrap(False)
+        # Fixed row heights: the view never has to measure unseen rows
+        rows_header = self.preview_view.verticalHeader()
+        rows_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rows_header.setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.preview_view.horizontalHeader().setDefaultSectionSize(160)
+        self.preview_view.setMinimumHeight(160)
+        preview_layout.addWidget(self.preview_view)
+        preview_group.setLayout(preview_layout)
+        root.addWidget(preview_group, 1)
+
+        # Settings
+        settings_group = QGroupBox("Import Settings")
+        settings_form = QFormLayout()
+
+        # Deck combo
+        self.deck_combo = QComboBox()
+        self.refresh_decks()  # also selects current deck if present
+        settings_form.addRow("Target Deck:", self.deck_combo)
+
+        # Subdeck creator
+        self.subdeck_container = subdeck_container = QWidget(self)
+        subdeck_row = QHBoxLayout(subdeck_container)
+        self.subdeck_edit = QLineEdit()
+        self.subdeck_edit.setPlaceholderText("New subdeck name (prefilled from file)")
+        self.create_subdeck_btn = QPushButton("Create subdeck")
+        self.create_subdeck_btn.clicked.connect(self.create_subdeck)
+        subdeck_row.addWidget(self.subdeck_edit)
+        subdeck_row.addWidget(self.create_subdeck_btn)
+        self.update_subdeck_enabled()
+        self.deck_combo.currentIndexChanged.connect(lambda _: self.update_subdeck_enabled())
+        settings_form.addRow("Add Subdeck:", subdeck_container)
+
+        # Note type combo
+        self.notetype_combo = QComboBox()
+        self.refresh_notetypes()
+        self.notetype_combo.currentIndexChanged.connect(lambda _: self.on_notetype_changed())
+        settings_form.addRow("Note Type:", self.notetype_combo)
+
+        # Delimiter combo
+        self.delimiter_combo = QComboBox()
+        self.delimiter_combo.addItems([
+            "Auto-detect",
+            "Comma (,)",
+            "Tab",
+            "Semicolon (;)",
+            "Pipe (|)",
+        ])
+        self.delimiter_combo.setCurrentIndex(0)
+        self.delimiter_combo.currentIndexChanged.connect(self.on_content_changed)
+        settings_form.addRow("Delimiter:", self.delimiter_combo)
+
+        # Column mapping (empty: columns in field order, extra last column = tags)
+        self.mapping_edit = QLineEdit()
+        self.mapping_edit.setPlaceholderText(
+            "In field order, e.g. Front=2, Back=1|br, tags=3|prefix:src::"
+        )
+        self.mapping_edit.setToolTip(
+            "Field=column(s) entries, comma-separated. Columns are numbered from 1; "
+            "join several with +, or use a \"quoted text\" constant. Steps after |: "
+            "raw (keep whitespace), html (escape), br (line breaks to <br>), and "
+            "prefix:<text> for tags. Fields without an entry are left alone."
+        )
+        settings_form.addRow("Column Mapping:", self.mapping_edit)
+        self.mapping_edit.textChanged.connect(lambda _: self.update_preview_labels())
+
+        # Duplicate handling
+        dup_container = QWidget(self)
+        dup_row = QHBoxLayout(dup_container)
+        dup_row.setContentsMargins(0, 0, 0, 0)
+        self.duplicate_combo = QComboBox()
+        for label, policy in POLICIES:
+            self.duplicate_combo.addItem(label, policy)
+        # Same default as the engine and the command line
+        self.duplicate_combo.setCurrentIndex(self.duplicate_combo.findData(ADD))
+        self.duplicate_deck_check = QCheckBox("Only match notes in target deck")
+        dup_row.addWidget(self.duplicate_combo)
+        dup_row.addWidget(self.duplicate_deck_check)
+        settings_form.addRow("Duplicates:", dup_container)
+
+        # Sync: which field identifies a note, and what to do with the rest
+        self.sync_container = QWidget(self)
+        sync_row = QHBoxLayout(self.sync_container)
+        sync_row.setContentsMargins(0, 0, 0, 0)
+        self.key_field_combo = QComboBox()
+        self.flag_missing_check = QCheckBox("Tag notes missing from the file")
+        self.flag_missing_check.setToolTip(
+            "After a complete sync, notes whose key is not in the file get the tag "
+            "missing-from-csv (removed again once they reappear)."
+        )
+        sync_row.addWidget(QLabel("Key field:"))
+        sync_row.addWidget(self.key_field_combo, 1)
+        sync_row.addWidget(self.flag_missing_check)
+        settings_form.addRow("Sync:", self.sync_container)
+        self.duplicate_combo.currentIndexChanged.connect(lambda _: self.update_sync_enabled())
+        self.update_key_fields()
+
+        settings_group.setLayout(settings_form)
+        root.addWidget(settings_group)
+
+        # Buttons
+        btns = QHBoxLayout()
+        self.quick_btn = QPushButton("Quick Import")
+        self.quick_btn.clicked.connect(self.do_import)
+        self.quick_btn.setDefault(True)
+        self.anki_btn = QPushButton("Import with Anki dialog")
+        self.anki_btn.clicked.connect(self.open_with_default_importer)
+        # Shown when an earlier Quick Import of the file did not finish
+        self.resume_btn = QPushButton()
+        self.resume_btn.clicked.connect(self.do_resume)
+        self.resume_btn.hide()
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.reject)
+        btns.addStretch()
+        btns.addWidget(self.resume_btn)
+        btns.addWidget(self.quick_btn)
+        btns.addWidget(self.anki_btn)
+        btns.addWidget(cancel_btn)
+        root.addLayout(btns)
+
+        self.setLayout(root)
+
+    def wrap_layout(self, layout):
+        # Wrap a QLayout into a QWidget for use in QFormLayout rows
+        w = QWidget(self)
+        w.setLayout(layout)
+        return w
+
+    # -------------------- Deck/model helpers --------------------
+    def refresh_decks(self, select_name: str | None = None):
+        # The combo is only refilled when the cached list was replaced
+        try:
+            infos = catalog.decks(mw.col)
+        except Exception:
+            infos = []
+        if infos is not self.deck_infos:
+            self.deck_infos = infos
+            self.deck_combo.clear()
+            self.deck_combo.addItems([d.name for d in infos])
+        # Select current deck by default
+        try:
+            cur = mw.col.decks.current()
+            cur_name = cur["name"] if isinstance(cur, dict) else getattr(cur, "name", "")
+            if cur_name:
+                idx = self.deck_combo.findText(cur_name)
+                if idx >= 0:
+                    self.deck_combo.setCurrentIndex(idx)
+        except Exception:
+            pass
+        # Optionally select requested deck name
+        if select_name:
+            idx = self.deck_combo.findText(select_name)
+            if idx >= 0:
+                self.deck_combo.setCurrentIndex(idx)
+
+    def refresh_notetypes(self):
+        try:
+            infos = catalog.notetypes(mw.col)
+        except Exception:
+            infos = []
+        if infos is self.model_infos:
+            return
+        selected = self._model_id_from_index(self.notetype_combo.currentIndex())
+        self.model_infos = infos
+        self.notetype_combo.clear()
+        self.notetype_combo.addItems([m.name for m in infos])
+        for i, m in enumerate(infos):
+            if m.id == selected:
+                self.notetype_combo.setCurrentIndex(i)
+                break
+
+    def prepare(self):
+        """Bring a reused dialog up to date before it is shown again."""
+        self.refresh_decks()
+        self.refresh_notetypes()
+        self.update_watch_button()
+        self.file_paths = []
+        self.file_path = ""
+        self.file_edit.clear()
+        self.subdeck_edit.clear()
+        self.checkpoint = None
+        self.clear_directive_mapping()
+        self.resume_btn.hide()
+        self.anki_btn.setEnabled(True)
+        self.update_subdeck_enabled()
+        self.on_content_changed()
+
+    def clear_directive_mapping(self):
+        """Drop a mapping that came from the previous file's #mapping line;
+        one the user typed is kept."""
+        if self.directive_mapping is not None:
+            if self.mapping_edit.text().strip() == self.directive_mapping:
+                self.mapping_edit.clear()
+            self.directive_mapping = None
+
+    def _deck_id_from_index(self, i):
+        if not self.deck_infos or i < 0 or i >= len(self.deck_infos):
+            return None
+        d = self.deck_infos[i]
+        return getattr(d, "id", getattr(d, "did", None))
+
+    def _model_id_from_index(self, i):
+        if not self.model_infos or i < 0 or i >= len(self.model_infos):
+            return None
+        m = self.model_infos[i]
+        return getattr(m, "id", None)
+
+    def on_notetype_changed(self):
+        self.update_preview_labels()
+        self.update_key_fields()
+
+    def preview_layout(self, field_names):
+        """Column layout of the mapping the import would use, for the preview."""
+        spec = self.mapping_edit.text().strip()
+        if not spec:
+            analysis = self.current_analysis()
+            spec = analysis.directives.get("mapping") if analysis else None
+        try:
+            return column_layout(spec, field_names)
+        except ValueError:
+            return None  # reported when importing
+
+    def update_preview_labels(self):
+        field_names = self.selected_field_names()
+        self.preview_model.set_field_names(field_names, self.preview_layout(field_names))
+
+    def update_key_fields(self):
+        if not hasattr(self, "key_field_combo"):
+            return  # note type combo is filled before the sync row exists
+        previous = self.key_field_combo.currentIndex()
+        self.key_field_combo.clear()
+        self.key_field_combo.addItems(self.selected_field_names())
+        if 0 <= previous < self.key_field_combo.count():
+            self.key_field_combo.setCurrentIndex(previous)
+        self.update_sync_enabled()
+
+    def update_sync_enabled(self):
+        self.sync_container.setEnabled(self.duplicate_combo.currentData() == SYNC)
+
+    def update_subdeck_enabled(self):
+        # In multi-file mode every file gets its own subdeck
+        self.subdeck_container.setEnabled(self.deck_combo.count() > 0 and not self.is_batch())
+
+    def create_subdeck(self):
+        parent_name = self.deck_combo.currentText().strip()
+        child = self.subdeck_edit.text().strip()
+        if not child:
+            showWarning("Enter a subdeck name first.")
+            return
+        child = normalize_subdeck_name(child)
+        full_name = f"{parent_name}::{child}"
+        try:
+            did = mw.col.decks.id(full_name)  # creates if missing
+            mw.col.decks.select(did)
+            pos = catalog.add_deck(full_name, did)
+            if pos is not None and self.deck_infos is catalog.decks(mw.col):
+                # Same list object: the entry is already at `pos` in deck_infos
+                self.deck_combo.insertItem(pos, full_name)
+                self.deck_combo.setCurrentIndex(pos)
+            else:
+                self.refresh_decks(select_name=full_name)
+            self.status_label.setText(f"✓ Created subdeck: {full_name}")
+            # Clear after success
+            self.subdeck_edit.clear()
+        except Exception as e:
+            showWarning(f"Could not create subdeck: {e}")
+
+    # -------------------- File and content --------------------
+    def pick_file(self):
+        start_dir = mw.pm.profile.get(PROFILE_KEY_LAST_DIR, "")
+        paths, _ = QFileDialog.getOpenFileNames(
+            mw, "Select CSV(s) to Import", start_dir, sources.FILE_DIALOG_FILTER
+        )
+        if not paths:
+            return
+        self.set_files(paths)
+
+    def pick_folder(self):
+        start_dir = mw.pm.profile.get(PROFILE_KEY_LAST_DIR, "")
+        folder = QFileDialog.getExistingDirectory(mw, "Select Folder of CSVs", start_dir)
+        if not folder:
+            return
+        paths = sorted(
+            os.path.join(folder, name)
+            for name in os.listdir(folder)
+            if sources.is_supported(name) and os.path.isfile(os.path.join(folder, name))
+        )
+        if not paths:
+            showWarning("No CSV files found in that folder.")
+            return
+        self.set_files(paths)
+
+    def set_files(self, paths):
+        # Each CSV in a zip archive is imported on its own
+        try:
+            paths = sources.expand(paths)
+        except Exception as e:
+            showWarning(f"Could not read archive: {e}")
+            return
+        if not paths:
+            showWarning("No CSV files found in that archive.")
+            return
+        self.file_paths = list(paths)
+        self.file_path = self.file_paths[0]
+        self.clear_directive_mapping()
+        try:
+            mw.pm.profile[PROFILE_KEY_LAST_DIR] = os.path.dirname(
+                sources.container(self.file_path)
+            )
+        except Exception:
+            pass
+        if self.is_batch():
+            names = ", ".join(os.path.basename(p) for p in self.file_paths)
+            self.file_edit.setText(f"{len(self.file_paths)} files: {names}")
+            self.subdeck_edit.clear()
+            self.subdeck_edit.setPlaceholderText("One subdeck per file, named after the file")
+        else:
+            self.file_edit.setText(self.file_path)
+            self.subdeck_edit.setPlaceholderText("New subdeck name (prefilled from file)")
+            # Prefill subdeck name from file name
+            self.subdeck_edit.setText(subdeck_name_for(self.file_path))
+        self.anki_btn.setEnabled(not self.is_batch())
+        self.update_subdeck_enabled()
+        self.update_resume()
+        self.on_content_changed()
+
+    def update_watch_button(self):
+        settings = folder_watcher.settings
+        if settings:
+            self.watch_btn.setText("Stop Watching")
+            self.watch_btn.setToolTip(
+                f"New or changed CSVs in {settings['folder']} are imported automatically "
+                f"into subdecks of {settings['deck']}."
+            )
+        else:
+            self.watch_btn.setText("Watch Folder…")
+            self.watch_btn.setToolTip(
+                "Import CSVs dropped into a folder automatically, each into a subdeck of "
+                "the selected deck, using the options set here."
+            )
+
+    def toggle_watch(self):
+        settings = folder_watcher.settings
+        if settings:
+            if askUser(f"Stop watching {settings['folder']}?", parent=self):
+                folder_watcher.disable()
+                self.update_watch_button()
+            return
+        parent_name = self.deck_combo.currentText().strip()
+        if self._deck_id_from_index(self.deck_combo.currentIndex()) is None:
+            showWarning("Pick the deck to import into first.")
+            return
+        start_dir = mw.pm.profile.get(PROFILE_KEY_LAST_DIR, "")
+        folder = QFileDialog.getExistingDirectory(mw, "Select Folder to Watch", start_dir)
+        if not folder:
+            return
+        existing = [name for name in os.listdir(folder) if sources.is_supported(name)]
+        import_existing = bool(existing) and askUser(
+            f"Also import the {len(existing)} CSV file(s) already in the folder?",
+            parent=self,
+        )
+        options = self.import_options()
+        folder_watcher.enable({
+            "folder": folder,
+            "deck": parent_name,
+            "notetype_id": self._model_id_from_index(self.notetype_combo.currentIndex()),
+            "has_header": options.has_header,
+            "policy": options.policy,
+            "dedupe_in_deck": options.dedupe_in_deck,
+            "key_field": options.key_field,
+            "mapping": options.mapping,
+            "import_media": options.import_media,
+        }, import_existing)
+        self.update_watch_button()
+        tooltip(f"Watching {folder} for CSV files", parent=self)
+
+    def update_resume(self):
+        """Offer to resume if an unfinished import of the file was journaled."""
+        self.checkpoint = None if self.is_batch() else journal.load(self.file_path, mw.col)
+        cp = self.checkpoint
+        if cp is None:
+            self.resume_btn.hide()
+            return
+        self.resume_btn.setText(f"Resume from row {cp.next_row:,}")
+        self.resume_btn.setToolTip(
+            f"An earlier Quick Import into {cp.deck or 'the target deck'} ({cp.notetype}) "
+            f"stopped after {cp.added:,} note(s). Resuming continues right after the "
+            f"last committed batch."
+        )
+        self.resume_btn.show()
+
+    def is_batch(self) -> bool:
+        return len(self.file_paths) > 1
+
+    def current_analysis(self):
+        """Cached analysis of the selected file (None if unreadable)."""
+        if not self.file_path:
+            return None
+        return self.analysis_cache.get(self.file_path, candidates=encoding_candidates())
+
+    # -------------------- Directives and detection --------------------
+    def find_model_index_by_name(self, name: str):
+        return find_notetype_index(self.model_infos, name)
+
+    def get_delimiter_name(self, delimiter: str):
+        return delimiter_name(delimiter)
+
+    def get_delimiter(self):
+        selection = self.delimiter_combo.currentText()
+        if selection == "Auto-detect":
+            analysis = self.current_analysis()
+            if analysis and analysis.has_data():
+                try:
+                    return analysis.detected_delimiter()
+                except Exception:
+                    return ","
+            return ","
+        mapping = {
+            "Comma (,)": ",",
+            "Tab": "\t",
+            "Semicolon (;)": ";",
+            "Pipe (|)": "|",
+        }
+        return mapping.get(selection, ",")
+
+    def auto_pick_note_type(self, analysis, delimiter: str, has_header_hint: bool,
+                            profile=None):
+        """Score note types against the file; returns (index, name, field count).
+
+        Runs on the analysis worker, so it must not touch any widgets.
+        """
+        return pick_note_type(mw.col, analysis, delimiter, has_header_hint, profile)
+
+    # -------------------- Status / content change --------------------
+    def on_content_changed(self):
+        # Debounce: rapid toggles restart the timer and only the last one
+        # reaches start_analysis(); bumping the generation marks any running
+        # analysis as stale.
+        self._analysis_generation += 1
+        if not self.file_path:
+            self._analysis_timer.stop()
+            self.status_label.setText("")
+            self.preview_model.clear()
+            return
+        if self.is_batch():
+            self._analysis_timer.stop()
+            self.preview_model.clear()
+            parent = self.deck_combo.currentText().strip()
+            self.status_label.setText(
+                f"✓ {len(self.file_paths)} files selected • each is detected separately and "
+                f"imported into {parent}::<file name>"
+            )
+            return
+        self.status_label.setText("Analyzing…")
+        self._analysis_timer.start()
+
+    def start_analysis(self):
+        if self._analysis_running:
+            # Picked up again when the running (now stale) worker returns
+            self._analysis_pending = True
+            return
+        generation = self._analysis_generation
+        manual = self.delimiter_combo.currentText() != "Auto-detect"
+        delimiter = self.get_delimiter() if manual else None
+        header_hint = self.header_check.isChecked()
+        self._analysis_running = True
+        self._analysis_pending = False
+        mw.taskman.run_in_background(
+            lambda: self.analyze_content(delimiter, header_hint, generation),
+            lambda fut: self.on_analysis_done(fut, generation),
+        )
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self._analysis_generation
+
+    def analyze_content(self, delimiter: str | None, header_hint: bool, generation: int):
+        """Worker side of the status refresh. Returns None once superseded."""
+        # No tracemalloc here: superseded analyses are simply dropped
+        profile = new_profile("analysis", memory=False)
+        with phase(profile, "read prefix"):
+            analysis = self.current_analysis()
+        if not analysis or analysis.empty:
+            return {"empty": True}
+        if self.is_stale(generation):
+            return None
+
+        # Directive notetype override
+        nt_name = analysis.directives.get("notetype")
+        forced = None
+        if nt_name:
+            idx = self.find_model_index_by_name(nt_name)
+            if idx is not None:
+                try:
+                    forced = (
+                        self.model_infos[idx].id,
+                        self.model_infos[idx].name,
+                        len(mw.col.models.get(self.model_infos[idx].id)["flds"]),
+                    )
+                except Exception:
+                    pass
+
+        # Delimiter and rows (estimated from a sample on very large files)
+        dialect = None
+        if delimiter is None:
+            with phase(profile, "sniff"):
+                delimiter = analysis.detected_delimiter()
+                if not analysis.directive_delimiter:
+                    dialect = analysis.dialect()
+        try:
+            with phase(profile, "count rows"):
+                rows, estimated = analysis.estimate_rows(
+                    delimiter, estimate_threshold_bytes(), header_hint
+                )
+        except Exception:
+            rows, estimated = 0, False
+        if self.is_stale(generation):
+            return None
+
+        # Auto-pick note type if not forced
+        detected = None
+        if not forced:
+            detected = self.auto_pick_note_type(analysis, delimiter, header_hint, profile)
+        if profile is not None:
+            profile.info.update(
+                file=os.path.basename(analysis.path), size=analysis.size,
+                encoding=analysis.encoding, delimiter=delimiter, rows=rows,
+            )
+            profile.finish()
+        return {
+            "profile": profile,
+            "encoding": analysis.encoding,
+            "delimiter": delimiter,
+            "confidence": dialect.confidence if dialect else None,
+            "header_likely": bool(dialect and dialect.has_header
+                                  and analysis.directive_header is None),
+            "rows": rows,
+            "estimated": estimated,
+            "forced": forced,
+            "detected": detected,
+            "mapping": analysis.directives.get("mapping"),
+            "header": analysis.directive_header,
+            "deck": analysis.directive_deck,
+            "directives": [k for k in FILE_DIRECTIVES if k in analysis.directives],
+        }
+
+    def on_analysis_done(self, future, generation: int):
+        self._analysis_running = False
+        if self._analysis_pending or self.is_stale(generation):
+            # Drop the stale result; the newest request is already queued
+            # or waiting on the debounce timer.
+            if self._analysis_pending:
+                self.start_analysis()
+            return
+        try:
+            info = future.result()
+        except Exception as e:
+            self.status_label.setText(f"⚠ Detection failed: {str(e)}")
+            return
+        if info is None:
+            return
+        if info.get("empty"):
+            self.status_label.setText("")
+            self.preview_model.clear()
+            return
+
+        if info.get("mapping") and not self.mapping_edit.text().strip():
+            self.mapping_edit.setText(info["mapping"])
+            self.directive_mapping = info["mapping"]
+        if info.get("deck"):
+            idx = self.deck_combo.findText(info["deck"])
+            if idx >= 0:
+                self.deck_combo.setCurrentIndex(idx)
+        if info.get("header") is not None and info["header"] != self.header_check.isChecked():
+            # Re-runs the (cached) analysis with the header the file declares
+            self.header_check.setChecked(info["header"])
+        chosen = info["forced"] or info["detected"]
+        if chosen:
+            # Matched by id: the combo and the note-type index are cached apart
+            for i, m in enumerate(self.model_infos):
+                if m.id == chosen[0]:
+                    self.notetype_combo.setCurrentIndex(i)
+                    break
+        self.render_status(info)
+        self.update_preview(info, generation)
+        profile = info.get("profile")
+        if profile is not None:
+            write_record(profile)
+            self.status_label.setToolTip(f"Analysis: {profile.summary()}")
+        if info["estimated"] and get_config().get("refine_row_estimate", True):
+            self.refine_row_count(info, generation)
+
+    def refine_row_count(self, info: dict, generation: int):
+        """Replace a sampled row estimate with the exact count in the background."""
+        analysis = self.current_analysis()
+        if not analysis:
+            return
+
+        def on_done(fut):
+            if self.is_stale(generation):
+                return
+            try:
+                info["rows"] = fut.result()
+            except Exception:
+                return
+            info["estimated"] = False
+            self.render_status(info)
+
+        # File-only work: keep it off the collection executor
+        mw.taskman.run_in_background(
+            lambda: analysis.row_count(info["delimiter"]), on_done, uses_collection=False
+        )
+
+    def selected_field_names(self) -> list:
+        model_id = self._model_id_from_index(self.notetype_combo.currentIndex())
+        try:
+            return [f["name"] for f in mw.col.models.get(model_id)["flds"]]
+        except Exception:
+            return []
+
+    def update_preview(self, info: dict, generation: int):
+        """Show the first rows now; index the whole file in the background."""
+        analysis = self.current_analysis()
+        if not analysis:
+            self.preview_model.clear()
+            return
+        delimiter = info["delimiter"]
+        field_names = self.selected_field_names()
+        self.preview_model.set_source(
+            analysis, delimiter, self.header_check.isChecked(), field_names,
+            self.preview_layout(field_names),
+        )
+        if analysis.compressed:
+            # Each block would be decompressed from the start: first rows only
+            return
+
+        def on_done(fut):
+            if self.is_stale(generation):
+                return
+            try:
+                index = fut.result()
+            except Exception:
+                return
+            self.preview_model.set_row_index(analysis, delimiter, index)
+
+        mw.taskman.run_in_background(
+            lambda: analysis.row_index(delimiter, should_stop=lambda: self.is_stale(generation)),
+            on_done,
+            uses_collection=False,  # file-only; must not hold up collection ops
+        )
+
+    def render_status(self, info: dict):
+        forced = info["forced"]
+        detected = info["detected"]
+        parts = []
+        delimiter = f"✓ Detected: {self.get_delimiter_name(info['delimiter'])} delimiter"
+        confidence = info.get("confidence")
+        if confidence is not None:
+            delimiter += f" ({confidence:.0%} confidence)"
+        parts.append(delimiter)
+        if info.get("header_likely") and not self.header_check.isChecked():
+            parts.append("First row looks like a header")
+        parts.append(format_row_count(info["rows"], info["estimated"]))
+        parts.append(f"Encoding: {info['encoding']}")
+        if info.get("deck") and self.deck_combo.findText(info["deck"]) < 0:
+            parts.append(f"Deck: {info['deck']} (new, via directive)")
+        if forced:
+            _, model_name, field_count = forced
+            parts.append(f"Note type: {model_name} ({field_count} field(s), via directive)")
+        elif detected:
+            _, model_name, field_count = detected
+            parts.append(f"Note type: {model_name} ({field_count} field(s))")
+        if info.get("directives"):
+            parts.append(f"From header: {', '.join(info['directives'])}")
+        self.status_label.setText(" • ".join(parts))
+
+    # -------------------- Import paths --------------------
+    def open_with_default_importer(self):
+        if not self.file_path:
+            showWarning("Pick a CSV file first.")
+            return
+
+        # Select deck for sane defaults
+        deck_idx = self.deck_combo.currentIndex()
+        deck_id = self._deck_id_from_index(deck_idx)
+        if deck_id is not None:
+            try:
+                mw.col.decks.select(deck_id)
+            except Exception:
+                pass
+
+        # Anki's importer gets the file itself, or a copy without directives
+        profile = new_profile("anki_importer")
+        with phase(profile, "read prefix"):
+            analysis = self.current_analysis()
+        if not analysis:
+            showWarning("Could not read the selected file.")
+            return
+
+        try:
+            with phase(profile, "prepare file"):
+                path = handoff_path(analysis, temp_files)
+        except Exception as e:
+            showWarning(f"Could not write temp CSV: {e}")
+            return
+
+        try:
+            with phase(profile, "open importer"):
+                importFile(mw, path)
+            self.accept()
+        except Exception as e:
+            showWarning(f"Could not open import dialog: {e}")
+        finish_profile(
+            profile, file=os.path.basename(analysis.path), size=analysis.size,
+            copied=path != analysis.path,
+        )
+        # The copy (if any) is deleted once Anki has imported it, see handoff.py
+
+    def do_import(self):
+        if not self.file_path:
+            showWarning("Pick a CSV file first.")
+            return
+        if self.is_batch():
+            self.do_batch_import()
+            return
+
+        # Re-apply directive notetype at import time
+        analysis = self.current_analysis()
+        if not analysis:
+            showWarning("Could not read the selected file.")
+            return
+        nt_name = analysis.directives.get("notetype")
+        if nt_name:
+            idx = self.find_model_index_by_name(nt_name)
+            if idx is not None:
+                self.notetype_combo.setCurrentIndex(idx)
+
+        deck_idx = self.deck_combo.currentIndex()
+        model_idx = self.notetype_combo.currentIndex()
+        deck_id = self._deck_id_from_index(deck_idx)
+        model_id = self._model_id_from_index(model_idx)
+        # A #deck directive naming a deck that does not exist yet creates it,
+        # within the import's undo step
+        new_deck = analysis.directive_deck
+        if not new_deck or self.deck_combo.findText(new_deck) >= 0:
+            new_deck = None
+
+        if deck_id is None and new_deck is None:
+            showWarning("Could not resolve target deck.")
+            return
+        if model_id is None:
+            showWarning("Could not resolve note type.")
+            return
+
+        try:
+            notetype = mw.col.models.get(model_id)
+            if not notetype:
+                showWarning("Selected note type not found.")
+                return
+
+            if not analysis.has_data():
+                showWarning("No data rows found.")
+                return
+
+            delimiter = self.get_delimiter()
+            options = self.import_options(model_id)
+            options.delimiter = delimiter
+            try:
+                compile_mapping(options.mapping, [f["name"] for f in notetype["flds"]])
+            except ValueError as e:
+                showWarning(str(e))
+                return
+            total_rows, _ = analysis.estimate_rows(
+                delimiter, options.estimate_threshold_bytes, options.has_header
+            )
+            if options.has_header and total_rows > 1:
+                total_rows -= 1
+            if new_deck is None:
+                mw.col.decks.select(deck_id)
+        except Exception as e:
+            showWarning(f"Import failed: {str(e)}")
+            return
+        self.run_quick_import(analysis, options, deck_id, total_rows, new_deck=new_deck)
+
+    def do_resume(self):
+        """Continue a journaled Quick Import right after its last committed batch."""
+        cp = self.checkpoint
+        if cp is None or not self.file_path:
+            return
+        if not mw.col.decks.get(cp.deck_id, default=False):
+            showWarning(f"The deck of the unfinished import ({cp.deck}) no longer exists.")
+            return
+        if not mw.col.models.get(cp.notetype_id):
+            showWarning(f"The note type of the unfinished import ({cp.notetype}) no longer exists.")
+            return
+        options = self.import_options(cp.notetype_id)
+        options.delimiter = cp.delimiter
+        options.encoding = cp.encoding
+        analysis = self.analysis_cache.get(self.file_path, cp.encoding)
+        if not analysis:
+            showWarning("Could not read the selected file.")
+            return
+        total_rows, _ = analysis.estimate_rows(
+            cp.delimiter, options.estimate_threshold_bytes, options.has_header
+        )
+        mw.col.decks.select(cp.deck_id)
+        self.run_quick_import(analysis, options, cp.deck_id, max(total_rows - cp.row, 0), cp)
+
+    def run_quick_import(self, analysis, options, deck_id, total_rows: int, resume=None,
+                         new_deck: str | None = None):
+        """Import into `deck_id`, or into `new_deck`, created by the import."""
+        delimiter = options.delimiter
+        profile = new_profile("quick_import")
+        progress = ImportProgressDialog(total_rows, self)
+        progress.show()
+
+        def report(done):
+            mw.taskman.run_on_main(lambda: progress.update_rows(done))
+
+        def run(col, plan):
+            target = deck_id
+            if new_deck is not None:
+                target = col.decks.id(new_deck)  # creates parents too
+                col.decks.select(target)
+            return import_plan(
+                col, plan, target, options,
+                progress=report, should_cancel=progress.cancel_event.is_set,
+                profile=profile, journal=journal, resume=resume,
+            )
+
+        def op(col):
+            plan = plan_import(col, analysis, options, profile=profile)
+            return ImportOutcome(*undoable(
+                col, lambda: run(col, plan),
+                on_rollback=lambda: rollback_journal(journal, analysis.path, resume),
+            ))
+
+        def on_done(outcome):
+            # outcome.changes is announced after this (see run_import_op),
+            # refreshing the deck list and overview; no full reset needed
+            result = outcome.value
+            progress.finish()
+            self.set_import_running(False)
+            if new_deck is not None:
+                catalog.invalidate_decks()
+            msg = f"Import complete!\n\nAdded: {result.added} note(s)"
+            if result.cancelled:
+                msg = f"Import cancelled.\n\nAdded: {result.added} note(s) before cancelling"
+                msg += "\nReopen the file to resume where it stopped."
+            elif resume is not None:
+                msg = (
+                    f"Import resumed from row {resume.next_row:,} and completed!\n\n"
+                    f"Added: {result.added} note(s)"
+                )
+            if result.updated:
+                msg += f"\nUpdated: {result.updated} existing note(s)"
+            if result.skipped_empty:
+                msg += f"\nSkipped empty rows: {result.skipped_empty}"
+            msg += self.duplicate_summary(result)
+            msg += self.media_summary(result)
+            if self.delimiter_combo.currentText() == "Auto-detect":
+                msg += f"\n\nUsed delimiter: {self.get_delimiter_name(delimiter)}"
+            msg += finish_profile(
+                profile, file=os.path.basename(analysis.path), size=analysis.size,
+                encoding=analysis.encoding, delimiter=delimiter, added=result.added,
+                cancelled=result.cancelled, resumed_from=resume.next_row if resume else None,
+            )
+            showInfo(msg)
+            self.accept()
+
+        def on_failed(e):
+            progress.finish()
+            self.set_import_running(False)
+            finish_profile(profile, error=str(e))
+            self.update_resume()
+            showWarning(f"Import failed and was rolled back: {str(e)}")
+
+        self.set_import_running(True)
+        run_import_op(self, op, on_done, on_failed)
+
+    def import_options(self, notetype_id=None) -> ImportOptions:
+        """Snapshot of the dialog's settings for the import engine."""
+        manual = self.delimiter_combo.currentText() != "Auto-detect"
+        return ImportOptions(
+            delimiter=self.get_delimiter() if manual else None,
+            has_header=self.header_check.isChecked(),
+            notetype_id=notetype_id,
+            encodings=encoding_candidates(),
+            policy=self.duplicate_combo.currentData(),
+            dedupe_in_deck=self.duplicate_deck_check.isChecked(),
+            key_field=max(self.key_field_combo.currentIndex(), 0),
+            flag_missing=self.flag_missing_check.isChecked(),
+            mapping=self.mapping_edit.text().strip() or None,
+            import_media=self.media_check.isChecked(),
+            estimate_threshold_bytes=estimate_threshold_bytes(),
+            parallel_min_bytes=parallel_min_bytes(),
+        )
+
+    def do_batch_import(self):
+        """Import every selected file into its own subdeck of the target deck."""
+        parent_name = self.deck_combo.currentText().strip()
+        if self._deck_id_from_index(self.deck_combo.currentIndex()) is None:
+            showWarning("Could not resolve target deck.")
+            return
+        paths = list(self.file_paths)
+        options = self.import_options()
+        fallback_model_id = self._model_id_from_index(self.notetype_combo.currentIndex())
+        profile = new_profile("batch_import")
+
+        progress = ImportProgressDialog(0, self)
+        progress.setLabelText(f"Analyzing {len(paths)} files…")
+        progress.show()
+
+        def report(done):
+            mw.taskman.run_on_main(lambda: progress.update_rows(done))
+
+        def op(col):
+            plans = plan_imports(col, paths, options, fallback_model_id, profile=profile)
+            total = sum(plan.rows for plan in plans)
+            mw.taskman.run_on_main(lambda: progress.set_total(total))
+            return ImportOutcome(*undoable(col, lambda: import_into_subdecks(
+                col, plans, parent_name, options,
+                progress=report, should_cancel=progress.cancel_event.is_set, profile=profile,
+            )))
+
+        def on_done(outcome):
+            outcomes = outcome.value
+            progress.finish()
+            self.set_import_running(False)
+            catalog.invalidate_decks()  # one subdeck per file
+            added = sum(result.added for _, _, result in outcomes)
+            if any(result.cancelled for _, _, result in outcomes):
+                msg = f"Import cancelled.\n\nAdded: {added} note(s) before cancelling"
+            else:
+                msg = f"Import complete!\n\nAdded: {added} note(s) from {len(outcomes)} file(s)"
+            for plan, deck_name, result in outcomes:
+                line = f"\n\n{os.path.basename(plan.path)} → {deck_name}"
+                line += f"\n  {plan.notetype_name}, {self.get_delimiter_name(plan.delimiter)}"
+                line += f" • added {result.added}"
+                if result.updated:
+                    line += f", updated {result.updated}"
+                if result.skipped_empty:
+                    line += f", skipped empty {result.skipped_empty}"
+                if result.unchanged:
+                    line += f", unchanged {result.unchanged}"
+                if result.skipped_duplicates:
+                    line += f", skipped duplicates {result.skipped_duplicates}"
+                if result.missing:
+                    line += f", tagged missing {result.missing}"
+                media = result.media
+                if media and (media.copied or media.missing or media.conflicts):
+                    line += f"\n  media: copied {media.copied}, missing {media.missing}"
+                    if media.conflicts:
+                        line += f", name conflicts {media.conflicts}"
+                msg += line
+            msg += finish_profile(
+                profile, files=len(outcomes), size=sum(p.analysis.size for p, _, _ in outcomes),
+                added=added,
+            )
+            showInfo(msg)
+            self.accept()
+
+        def on_failed(e):
+            progress.finish()
+            self.set_import_running(False)
+            catalog.invalidate_decks()
+            finish_profile(profile, error=str(e))
+            showWarning(f"Import failed and was rolled back: {str(e)}")
+
+        self.set_import_running(True)
+        run_import_op(self, op, on_done, on_failed)
+
+    def media_summary(self, result) -> str:
+        media = result.media
+        if not media or not (media.copied or media.present or media.missing or media.conflicts):
+            return ""
+        msg = f"\n\nMedia: copied {media.copied}, already present {media.present}"
+        msg += f", missing {media.missing}"
+        if media.conflicts:
+            msg += f"\n  Kept {media.conflicts} existing file(s) with the same name but "
+            msg += "different content"
+        return msg
+
+    def duplicate_summary(self, result) -> str:
+        if not (result.duplicates or result.duplicates_in_file or result.missing):
+            return ""
+        label = {policy: label for label, policy in POLICIES}.get(result.policy, result.policy)
+        msg = f"\n\nDuplicates ({label}):"
+        if result.duplicates:
+            msg += f"\n  Already in collection: {result.duplicates}"
+        if result.duplicates_in_file:
+            msg += f"\n  Repeated within file: {result.duplicates_in_file}"
+        if result.unchanged:
+            msg += f"\n  Unchanged: {result.unchanged}"
+        if result.skipped_duplicates:
+            msg += f"\n  Skipped: {result.skipped_duplicates}"
+        if result.missing:
+            msg += f"\n  Missing from file (tagged missing-from-csv): {result.missing}"
+        return msg
+
+    def set_import_running(self, running: bool):
+        for w in (self.quick_btn, self.resume_btn, self.browse_btn, self.folder_btn,
+                  self.watch_btn):
+            w.setEnabled(not running)
+        self.anki_btn.setEnabled(not running and not self.is_batch())
+
+
+# -------------------- Watch folder --------------------
+def watch_options(settings: dict) -> ImportOptions:
+    return ImportOptions(
+        has_header=settings.get("has_header", False),
+        encodings=encoding_candidates(),
+        policy=settings.get("policy", ADD),
+        dedupe_in_deck=settings.get("dedupe_in_deck", False),
+        key_field=settings.get("key_field", 0),
+        mapping=settings.get("mapping"),
+        import_media=settings.get("import_media", True),
+        estimate_threshold_bytes=estimate_threshold_bytes(),
+        parallel_min_bytes=parallel_min_bytes(),
+    )
+
+
+class FolderWatcher:
+    """Polls the profile's watch folder on a timer and imports new or
+    changed CSVs into subdecks of the configured deck, in the background.
+
+    The poll itself (see watch.py) runs off the main thread and does not
+    touch the collection; only files it reports start an import.
+    """
+
+    def __init__(self):
+        self.watch = None
+        self.timer = None
+        self.busy = False
+
+    @property
+    def settings(self) -> dict | None:
+        try:
+            return mw.pm.profile.get(PROFILE_KEY_WATCH)
+        except Exception:
+            return None
+
+    def start(self):
+        self.stop()
+        settings = self.settings
+        if not settings:
+            return
+        self.watch = FolderWatch(settings["folder"], mw.pm.name)
+        self.timer = QTimer(mw)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(watch_interval_ms())
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer.deleteLater()
+        self.timer = None
+        self.watch = None
+
+    def enable(self, settings: dict, import_existing: bool):
+        mw.pm.profile[PROFILE_KEY_WATCH] = settings
+        self.start()
+        if not import_existing:
+            self.watch.baseline()
+        self.poll()
+
+    def disable(self):
+        if self.watch is not None:
+            self.watch.forget()
+        mw.pm.profile.pop(PROFILE_KEY_WATCH, None)
+        self.stop()
+
+    def poll(self):
+        watch = self.watch
+        if self.busy or watch is None or mw.col is None:
+            return
+        self.busy = True
+
+        def on_polled(fut):
+            try:
+                paths = fut.result()
+            except Exception:
+                paths = []  # folder missing or unreadable; try again next time
+            if paths and watch is self.watch:
+                self.import_files(watch, paths)
+            else:
+                self.busy = False
+
+        # Stats and hashes files only; keep it off the collection executor
+        mw.taskman.run_in_background(watch.poll, on_polled, uses_collection=False)
+
+    def import_files(self, watch: FolderWatch, paths: list):
+        settings = dict(self.settings)
+        options = watch_options(settings)
+        parent_name = settings["deck"]
+
+        def run(col, plans):
+            col.decks.id(parent_name)  # creates if missing, within the undo step
+            return import_into_subdecks(col, plans, parent_name, options)
+
+        def op(col):
+            plans = plan_imports(col, sources.expand(paths), options,
+                                 settings.get("notetype_id"))
+            return ImportOutcome(*undoable(col, lambda: run(col, plans)))
+
+        def finish():
+            self.busy = False
+            catalog.invalidate_decks()  # subdecks may have been created
+            # A failed file is not retried until it changes again
+            if watch is self.watch:
+                watch.done(paths)
+
+        def on_done(outcome):
+            outcomes = outcome.value
+            finish()
+            added = sum(result.added for _, _, result in outcomes)
+            updated = sum(result.updated for _, _, result in outcomes)
+            msg = f"CSV watch folder: {len(outcomes)} file(s), added {added} note(s)"
+            if updated:
+                msg += f", updated {updated}"
+            tooltip(msg, period=5000)
+
+        def on_failed(e):
+            finish()
+            tooltip(f"CSV watch folder: import failed and was rolled back: {e}", period=8000)
+
+        run_import_op(mw, op, on_done, on_failed)
+
+
+folder_watcher = FolderWatcher()
+
+
+# -------------------- Menu integration --------------------
+_dialog = None
+
+
+def show_csv_file_import_dialog():
+    # Built once per profile; later opens only refresh what changed
+    global _dialog
+    if _dialog is None:
+        _dialog = CSVFileImportDialog(mw)
+    else:
+        _dialog.prepare()
+    _dialog.exec()
+
+
+def discard_dialog():
+    global _dialog
+    if _dialog is not None:
+        _dialog.deleteLater()
+        _dialog = None
+
+
+def setup_menu():
+    action = QAction("CSV File Import…", mw)
+    action.triggered.connect(show_csv_file_import_dialog)
+    mw.form.menuTools.addAction(action)
+
+
+gui_hooks.main_window_did_init.append(setup_menu)
+gui_hooks.operation_did_execute.append(note_type_index.on_operation_did_execute)
+gui_hooks.operation_did_execute.append(catalog.on_operation_did_execute)
+# Anki's own importer and other add-ons may change decks and end in mw.reset()
+gui_hooks.state_did_reset.append(catalog.invalidate)
+gui_hooks.profile_will_close.append(catalog.invalidate)
+gui_hooks.profile_will_close.append(discard_dialog)
+gui_hooks.profile_will_close.append(note_type_index.invalidate)
+gui_hooks.state_did_reset.append(note_type_index.invalidate)
+gui_hooks.profile_will_close.append(temp_files.cleanup)
+gui_hooks.profile_did_open.append(temp_files.sweep_stale)
+gui_hooks.profile_did_open.append(folder_watcher.start)
+gui_hooks.profile_will_close.append(folder_watcher.stop)
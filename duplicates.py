@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bulk duplicate detection for Quick Import.
+
+Anki treats two notes of the same note type as duplicates when their first
+fields match once HTML (except media references) is stripped, and keeps a
+32-bit checksum of that first field in notes.csum. DuplicateIndex loads the
+checksums of the target note type (optionally limited to one deck) with a
+single query, so each incoming row is classified in O(1); the stored first
+field is only compared on a checksum hit, to rule out collisions.
+"""
+
+try:
+    from anki.utils import field_checksum, strip_html_media
+except ImportError:  # outside Anki (the benchmarks); only DuplicateIndex needs them
+    field_checksum = strip_html_media = None
+
+
+SKIP = "skip"
+UPDATE = "update"
+ADD = "add"
+SYNC = "sync"  # see sync.py
+
+# (label, policy) in the order shown in the dialog
+POLICIES = (
+    ("Skip duplicates", SKIP),
+    ("Update existing notes", UPDATE),
+    ("Add anyway", ADD),
+    ("Sync changes (by key field)", SYNC),
+)
+
+NEW = "new"
+DUPLICATE = "duplicate"
+DUPLICATE_IN_FILE = "duplicate_in_file"
+
+
+class DuplicateIndex:
+    def __init__(self, col, notetype_id, deck_id=None):
+        # First field = everything before the first field separator
+        first_field = (
+            "case when instr(n.flds, char(31)) > 0 "
+            "then substr(n.flds, 1, instr(n.flds, char(31)) - 1) else n.flds end"
+        )
+        if deck_id is None:
+            rows = col.db.all(
+                f"select n.id, n.csum, {first_field} from notes n where n.mid = ?",
+                notetype_id,
+            )
+        else:
+            rows = col.db.all(
+                f"select distinct n.id, n.csum, {first_field} from notes n "
+                "join cards c on c.nid = n.id where n.mid = ? and c.did = ?",
+                notetype_id,
+                deck_id,
+            )
+        self.existing = {}  # csum -> [(note id, raw first field)]
+        for nid, csum, first in rows:
+            self.existing.setdefault(csum, []).append((nid, first))
+        self.seen = {}  # csum -> [raw first fields already in this file]
+
+    def classify(self, first: str) -> tuple[str, int | None]:
+        """Return (NEW | DUPLICATE | DUPLICATE_IN_FILE, existing note id)."""
+        csum = field_checksum(first)
+        existing = self.existing.get(csum)
+        seen = self.seen.get(csum)
+        if existing or seen:
+            stripped = strip_html_media(first)
+            for other in seen or ():
+                if strip_html_media(other) == stripped:
+                    return DUPLICATE_IN_FILE, None
+            for nid, other in existing or ():
+                if strip_html_media(other) == stripped:
+                    # Seen from here on: a repeat later in the file must not
+                    # update (or count against) the same note a second time
+                    self.seen.setdefault(csum, []).append(first)
+                    return DUPLICATE, nid
+        self.seen.setdefault(csum, []).append(first)
+        return NEW, None
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+
+"""
+Headless import engine.
+
+Everything Quick Import decides — directives, delimiter, note type, target
+deck, duplicate handling — as plain functions over a collection object and
+an ImportOptions, with no Qt involved. The dialog is a thin layer on top of
+this, and cli.py uses it to import into a collection file offline.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+from . import sources
+from .analysis import DEFAULT_ENCODINGS, FileAnalysis
+from .duplicates import ADD, SYNC, DuplicateIndex
+from .importer import (
+    DEFAULT_BATCH_SIZE, FileJob, ImportResult, NoteWriter, import_files, import_rows,
+    skip_header,
+)
+from .journal import Checkpoint, fingerprint
+from .mapping import compile_mapping, with_file_options
+from .media import media_collector
+from .notetypes import note_type_index
+from .parallel import DEFAULT_PARALLEL_MIN_BYTES, ParallelReader, use_parallel
+from .profiling import phase
+from .sync import SyncIndex, flag_missing
+
+
+DEFAULT_ESTIMATE_THRESHOLD_BYTES = 64 * 1024 * 1024
+UNDO_LABEL = "CSV File Import"
+
+DELIMITER_NAMES = {
+    ",": "Comma (,)",
+    "\t": "Tab",
+    ";": "Semicolon (;)",
+    "|": "Pipe (|)",
+}
+
+NOTETYPE_ALIASES = {
+    "cloze": "cloze",
+    "basic": "basic",
+    "basic (and reversed card)": "basic (and reversed card)",
+    "basic (type in the answer)": "basic (type in the answer)",
+}
+
+
+@dataclass
+class ImportOptions:
+    delimiter: str | None = None  # None: detect per file
+    has_header: bool = False
+    notetype_id: int | None = None  # None: auto-pick (a #notetype directive always wins)
+    encoding: str = "auto"
+    encodings: tuple = DEFAULT_ENCODINGS
+    policy: str = ADD
+    dedupe_in_deck: bool = False
+    key_field: int = 0  # SYNC: the field that identifies a note
+    flag_missing: bool = False  # SYNC: tag notes whose key is not in the file
+    mapping: str | None = None  # column mapping spec (mapping.py); else #mapping directive
+    import_media: bool = True  # copy files referenced by <img>/[sound:] from the CSV's folder
+    batch_size: int = DEFAULT_BATCH_SIZE
+    estimate_threshold_bytes: int = DEFAULT_ESTIMATE_THRESHOLD_BYTES
+    # Files at least this big are parsed in a process pool (None: never)
+    parallel_min_bytes: int | None = DEFAULT_PARALLEL_MIN_BYTES
+    workers: int | None = None  # None: one per core, at most 8
+
+
+@dataclass
+class ImportPlan:
+    """What detection decided for one file."""
+
+    path: str
+    analysis: FileAnalysis
+    delimiter: str
+    notetype_id: int | None
+    notetype_name: str
+    field_count: int
+    via: str  # "directive", "option", "detected" or "fallback"
+    rows: int = 0
+    estimated: bool = False
+    has_header: bool = False
+
+
+def delimiter_name(delimiter: str) -> str:
+    return DELIMITER_NAMES.get(delimiter, f"'{delimiter}'")
+
+
+def normalize_subdeck_name(name: str) -> str:
+    return re.sub(r"\s{2,}", " ", name.strip())
+
+
+def subdeck_name_for(path: str) -> str:
+    """Subdeck name for a file (or zip member): its base name without extension."""
+    return normalize_subdeck_name(sources.display_name(path))
+
+
+def open_analysis(path: str, options: ImportOptions, cache=None,
+                  profile=None) -> FileAnalysis | None:
+    with phase(profile, "read prefix"):
+        if cache is not None:
+            return cache.get(path, options.encoding, options.encodings)
+        try:
+            st = sources.stat(path)
+        except OSError:
+            return None
+        return FileAnalysis(path, st.st_size, st.st_mtime_ns, options.encoding, options.encodings)
+
+
+# -------------------- Note types --------------------
+def find_notetype_index(infos, name: str):
+    """Index into `infos` (all_names_and_ids) of the note type called `name`."""
+    if not name:
+        return None
+    target = name.strip().lower()
+    target = NOTETYPE_ALIASES.get(target, target)
+    for i, m in enumerate(infos):
+        if m.name.strip().lower() == target:
+            return i
+    return None
+
+
+def resolve_has_header(analysis: FileAnalysis, has_header: bool) -> bool:
+    """A #header directive wins over the option."""
+    declared = analysis.directive_header
+    return has_header if declared is None else declared
+
+
+def guess_has_header(analysis: FileAnalysis) -> bool:
+    if analysis.directive_header is not None:
+        return analysis.directive_header
+    return analysis.dialect().has_header
+
+
+def pick_note_type(col, analysis: FileAnalysis, delimiter: str, has_header_hint: bool,
+                   profile=None):
+    """Score note types against the file; returns (id, name, field count).
+
+    Column names come from a #columns directive if there is one, else from
+    the header row (if the file has one).
+    """
+    # Only the first row and a 20-row sample are scored
+    with phase(profile, "head rows"):
+        try:
+            rows = analysis.head_rows(delimiter, 21)
+        except Exception:
+            rows = []
+    if not rows:
+        return None
+    if has_header_hint or analysis.directive_header is not None:
+        has_header = resolve_has_header(analysis, has_header_hint)
+    else:
+        with phase(profile, "has_header"):
+            has_header = guess_has_header(analysis)
+    header = analysis.directive_columns(delimiter)
+    if header is None and has_header:
+        header = [c.strip() for c in rows[0]]
+    sample_rows = rows[1:21] if has_header else rows[:20]
+    col_counts = [len(r) for r in sample_rows] or [len(rows[0])]
+    observed_cols = max(col_counts) if col_counts else len(rows[0])
+
+    with phase(profile, "score note types"):
+        try:
+            return note_type_index.best_match(col, header, observed_cols)
+        except Exception:
+            return None
+
+
+def _notetype_summary(col, notetype_id):
+    notetype = col.models.get(notetype_id) if notetype_id is not None else None
+    if not notetype:
+        return None
+    return notetype["name"], len(notetype["flds"])
+
+
+def plan_import(col, analysis: FileAnalysis, options: ImportOptions,
+                fallback_notetype_id: int | None = None, profile=None) -> ImportPlan:
+    """Resolve delimiter, note type and row count for one file.
+
+    The note type comes from a #notetype directive, else options.notetype_id,
+    else the auto-picked one, else `fallback_notetype_id`.
+    """
+    delimiter = options.delimiter
+    if delimiter is None:
+        with phase(profile, "sniff"):
+            delimiter = analysis.detected_delimiter() if analysis.has_data() else ","
+    has_header = resolve_has_header(analysis, options.has_header)
+
+    infos = list(col.models.all_names_and_ids())
+    candidates = []
+    idx = find_notetype_index(infos, analysis.directives.get("notetype"))
+    if idx is not None:
+        candidates.append((infos[idx].id, "directive"))
+    if options.notetype_id is not None:
+        candidates.append((options.notetype_id, "option"))
+    if not candidates and analysis.has_data():
+        best = pick_note_type(col, analysis, delimiter, has_header, profile)
+        if best:
+            candidates.append((best[0], "detected"))
+    if fallback_notetype_id is not None:
+        candidates.append((fallback_notetype_id, "fallback"))
+
+    notetype_id, name, field_count, via = None, "", 0, "fallback"
+    for candidate_id, candidate_via in candidates:
+        summary = _notetype_summary(col, candidate_id)
+        if summary:
+            notetype_id, via = candidate_id, candidate_via
+            name, field_count = summary
+            break
+
+    rows, estimated = 0, False
+    if analysis.has_data():
+        with phase(profile, "count rows"):
+            rows, estimated = analysis.estimate_rows(
+                delimiter, options.estimate_threshold_bytes, has_header
+            )
+        if has_header and rows > 1:
+            rows -= 1
+    return ImportPlan(
+        path=analysis.path,
+        analysis=analysis,
+        delimiter=delimiter,
+        notetype_id=notetype_id,
+        notetype_name=name,
+        field_count=field_count,
+        via=via,
+        rows=rows,
+        estimated=estimated,
+        has_header=has_header,
+    )
+
+
+def plan_imports(col, paths, options: ImportOptions, fallback_notetype_id: int | None = None,
+                 max_workers: int | None = None, profile=None) -> list:
+    """plan_import() for several files; detection only reads each file's
+    prefix, so it runs on a thread pool."""
+    def plan(path):
+        analysis = open_analysis(path, options, profile=profile)
+        if analysis is None:
+            raise Exception(f"Could not read {os.path.basename(path)}.")
+        return plan_import(col, analysis, options, fallback_notetype_id, profile)
+
+    if not paths:
+        return []
+    workers = max_workers or min(len(paths), os.cpu_count() or 1, 8)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(plan, paths))
+
+
+# -------------------- Importing --------------------
+def plan_rows(plan: ImportPlan, has_header: bool):
+    if not plan.analysis.has_data():
+        return iter(())
+    rows = plan.analysis.reader(plan.delimiter)
+    return skip_header(rows) if has_header else rows
+
+
+def plan_reader(plan: ImportPlan, options: ImportOptions, start: int | None = None):
+    """(rows, tell) over a planned file from byte offset `start` on; tell()
+    is where the next row starts. Big files are parsed in parallel."""
+    if use_parallel(plan.analysis, plan.delimiter, options.parallel_min_bytes, start):
+        reader = ParallelReader(plan.analysis, plan.delimiter, start, options.workers)
+        return reader, reader.tell
+    return plan.analysis.tracked_reader(plan.delimiter, start)
+
+
+def _require_notetype(col, plan: ImportPlan):
+    notetype = col.models.get(plan.notetype_id) if plan.notetype_id is not None else None
+    if not notetype:
+        raise Exception(f"Could not resolve note type for {os.path.basename(plan.path)}.")
+    return notetype
+
+
+def row_mapper(plan: ImportPlan, options: ImportOptions, notetype):
+    """Compiled column mapping for a file: options.mapping, else its
+    #mapping directive, else columns in field order; plus the file's #html
+    and #tags directives."""
+    analysis = plan.analysis
+    spec = options.mapping or analysis.directives.get("mapping")
+    map_row = compile_mapping(spec, [f["name"] for f in notetype["flds"]])
+    return with_file_options(map_row, analysis.directive_html is False, analysis.directive_tags)
+
+
+def match_index(col, options: ImportOptions, notetype, deck_id):
+    """Index of existing notes for the duplicate policy (None under ADD)."""
+    if options.policy == ADD:
+        return None
+    scope = deck_id if options.dedupe_in_deck else None
+    if options.policy == SYNC:
+        return SyncIndex(col, notetype["id"], options.key_field, scope)
+    return DuplicateIndex(col, notetype["id"], scope)
+
+
+def _deck_name(col, deck_id) -> str:
+    try:
+        return col.decks.name(deck_id)
+    except Exception:
+        return ""
+
+
+def undoable(col, fn, label: str = UNDO_LABEL, on_rollback=None):
+    """Run fn() as one undo step; returns (fn's result, OpChanges).
+
+    Each batch fn() commits is its own backend transaction; merging them
+    into a custom undo entry turns the whole import into a single Undo. If
+    fn() raises, the entry is undone before the error propagates, so a
+    failed import leaves no notes behind (copied media files stay). A
+    cancel, Ctrl-C or crash is not an error: the committed batches are
+    kept and the import can be resumed.
+    """
+    step = col.add_custom_undo_entry(label)
+    try:
+        value = fn()
+    except Exception:
+        try:
+            col.merge_undo_entries(step)
+            col.undo()
+            clear_redo(col)
+        finally:
+            if on_rollback is not None:
+                on_rollback()
+        raise
+    return value, col.merge_undo_entries(step)
+
+
+def clear_redo(col):
+    """Drop the redo entry a rollback leaves, so Redo cannot re-apply the
+    partial import. Any undoable op clears the redo queue; writing a config
+    value unchanged is one that records no change, so the user's undo
+    history stays as it was."""
+    col.set_config("curDeck", col.get_config("curDeck", 1), undoable=True)
+
+
+def rollback_journal(journal, path: str, resume: Checkpoint | None):
+    """After a rolled-back run the journal must not point past rows that
+    are no longer in the collection: back to where the run started."""
+    if journal is None:
+        return
+    if resume is not None:
+        journal.save(resume)
+    else:
+        journal.clear(path)
+
+
+def checkpoint_saver(col, plan: ImportPlan, deck_id, journal, resume, skipped_header, tell):
+    """Callback that records progress in `journal` after each committed batch."""
+    # A copy: `resume` stays the point a rolled-back run returns to
+    cp = replace(resume) if resume else Checkpoint(
+        path=plan.path,
+        fingerprint=fingerprint(plan.path),
+        deck_id=deck_id,
+        deck=_deck_name(col, deck_id),
+        notetype_id=plan.notetype_id,
+        notetype=plan.notetype_name,
+        delimiter=plan.delimiter,
+        encoding=plan.analysis.encoding,
+        byte_offset=plan.analysis.data_byte_offset,
+    )
+    base = (cp.row + (1 if skipped_header else 0), cp.added, cp.updated)
+
+    def save(result):
+        cp.byte_offset = tell()
+        cp.row = base[0] + result.rows_seen
+        cp.added = base[1] + result.added
+        cp.updated = base[2] + result.updated
+        cp.last_note_id = result.last_note_id or cp.last_note_id
+        journal.save(cp)
+
+    return save
+
+
+def import_plan(col, plan: ImportPlan, deck_id, options: ImportOptions,
+                progress=None, should_cancel=None, profile=None,
+                journal=None, resume: Checkpoint | None = None) -> ImportResult:
+    """Quick Import of one planned file into `deck_id`.
+
+    With a `journal`, a checkpoint is saved after every committed batch and
+    cleared once the whole file is in. `resume` continues from such a
+    checkpoint: parsing starts at its byte offset and the header is not
+    skipped again. The returned counts cover this run only.
+
+    Under SYNC with options.flag_missing, notes missing from the file are
+    tagged once a complete (not resumed, not cancelled) pass is done.
+    """
+    notetype = _require_notetype(col, plan)
+    map_row = row_mapper(plan, options, notetype)
+    media = media_collector(col, plan.path) if options.import_media else None
+    with phase(profile, "duplicate index"):
+        duplicates = match_index(col, options, notetype, deck_id)
+
+    rows, tell = plan_reader(plan, options, resume.byte_offset if resume else None)
+    skipped_header = plan.has_header and resume is None
+    if skipped_header:
+        rows = skip_header(rows)
+    if journal is not None:
+        save_checkpoint = checkpoint_saver(col, plan, deck_id, journal, resume,
+                                           skipped_header, tell)
+    else:
+        save_checkpoint = None
+    result = import_rows(
+        col, notetype, deck_id, rows,
+        batch_size=options.batch_size, progress=progress, should_cancel=should_cancel,
+        duplicates=duplicates, policy=options.policy, profile=profile,
+        checkpoint=save_checkpoint, map_row=map_row, media=media,
+    )
+    if media is not None:
+        with phase(profile, "copy media"):
+            result.media = media.finish()
+    if journal is not None and not result.cancelled:
+        journal.clear(plan.path)
+    if options.policy == SYNC and options.flag_missing and not result.cancelled and not resume:
+        with phase(profile, "flag missing"):
+            result.missing = flag_missing(col, [duplicates])
+    return result
+
+
+def import_into_subdecks(col, plans, parent_deck: str, options: ImportOptions,
+                         progress=None, should_cancel=None, profile=None) -> list:
+    """Import each planned file into parent_deck::<file name>, or into the
+    deck its #deck directive names.
+
+    Returns [(plan, deck name, ImportResult)] in the order of `plans`.
+    Files are parsed in parallel; writes go through one thread.
+    """
+    jobs = []
+    decks = []
+    indexes = {}  # (note type id, deck id or None) -> DuplicateIndex/SyncIndex
+    for plan in plans:
+        notetype = _require_notetype(col, plan)
+        deck_name = (
+            plan.analysis.directive_deck or f"{parent_deck}::{subdeck_name_for(plan.path)}"
+        )
+        deck_id = col.decks.id(deck_name)  # creates if missing
+        duplicates = None
+        if options.policy != ADD:
+            key = (plan.notetype_id, deck_id if options.dedupe_in_deck else None)
+            duplicates = indexes.get(key)
+            if duplicates is None:
+                with phase(profile, "duplicate index"):
+                    duplicates = indexes[key] = match_index(col, options, notetype, deck_id)
+        jobs.append(FileJob(
+            plan.path,
+            lambda plan=plan: plan_rows(plan, plan.has_header),
+            NoteWriter(col, notetype, deck_id, duplicates, options.policy, profile,
+                       row_mapper(plan, options, notetype),
+                       media_collector(col, plan.path) if options.import_media else None),
+        ))
+        decks.append(deck_name)
+    import_files(col, jobs, options.batch_size, progress, should_cancel, profile=profile)
+    with phase(profile, "copy media"):
+        for job in jobs:
+            if job.writer.media is not None:
+                job.writer.result.media = job.writer.media.finish()
+    if (options.policy == SYNC and options.flag_missing
+            and not any(job.writer.result.cancelled for job in jobs)):
+        with phase(profile, "flag missing"):
+            for index in indexes.values():
+                missing = flag_missing(col, [index])
+                # Files sharing an index are one key space: report the count
+                # once, on the first of them, so totals are not multiplied
+                first = next(job for job in jobs if job.writer.duplicates is index)
+                first.writer.result.missing = missing
+    return [(plan, deck, job.writer.result) for plan, deck, job in zip(plans, decks, jobs)]
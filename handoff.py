@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+"""
+Handing a file over to Anki's own importer.
+
+Anki's importer reads UTF-8, so a UTF-8 file without directive lines is
+passed through as is. Otherwise a copy is made: UTF-8 files are copied byte
+for byte from the first data row, anything else is transcoded as a stream.
+Copies are tracked in a TempFileRegistry and deleted when the profile
+closes: Anki's import dialog is not modal and reads the file whenever the
+user confirms, so no earlier point is safe. Copies left behind by a crash
+are swept on the next profile open.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from . import sources
+
+TEMP_PREFIX = "anki_csv_file_"
+COPY_CHUNK_SIZE = 1024 * 1024
+STALE_AFTER_SECONDS = 24 * 60 * 60
+
+
+class TempFileRegistry:
+    """Temp files this add-on created and still has to delete."""
+
+    def __init__(self, prefix: str = TEMP_PREFIX):
+        self.prefix = prefix
+        self._paths = set()
+        self._lock = threading.Lock()
+
+    def mkstemp(self, suffix: str = ".csv"):
+        fd, path = tempfile.mkstemp(prefix=self.prefix, suffix=suffix)
+        with self._lock:
+            self._paths.add(path)
+        return fd, path
+
+    def discard(self, path: str):
+        with self._lock:
+            self._paths.discard(path)
+        _remove(path)
+
+    def cleanup(self, *_args):
+        """Delete every tracked file; files still in use are retried later."""
+        with self._lock:
+            paths = list(self._paths)
+        for path in paths:
+            if _remove(path):
+                with self._lock:
+                    self._paths.discard(path)
+
+    def sweep_stale(self, *_args, max_age: float = STALE_AFTER_SECONDS):
+        """Delete leftovers of earlier sessions (e.g. after a crash)."""
+        cutoff = time.time() - max_age
+        tmp = tempfile.gettempdir()
+        try:
+            names = os.listdir(tmp)
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(self.prefix):
+                continue
+            path = os.path.join(tmp, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def __len__(self):
+        with self._lock:
+            return len(self._paths)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False
+    return True
+
+
+def handoff_path(analysis, registry: TempFileRegistry) -> str:
+    """Path to give Anki's importer: the file itself when possible, else a
+    directive-free UTF-8 copy registered for cleanup."""
+    utf8 = analysis.codec == "utf-8"
+    if utf8 and not analysis.has_preamble and not analysis.compressed:
+        return analysis.path
+    fd, path = registry.mkstemp()
+    try:
+        if utf8:
+            # Skip the directive header by byte offset; no decoding needed
+            with os.fdopen(fd, "wb") as out, sources.open_binary(analysis.path) as src:
+                src.seek(analysis.data_byte_offset)
+                shutil.copyfileobj(src, out, COPY_CHUNK_SIZE)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+                out.writelines(analysis.iter_lines())
+    except Exception:
+        registry.discard(path)
+        raise
+    return path
+
+
+temp_files = TempFileRegistry()
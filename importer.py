@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming Quick Import engine.
+
+Rows are pulled lazily from a csv reader, turned into notes and committed in
+fixed-size batches through the collection's bulk add API, so memory use does
+not grow with the size of the file. Several files can be parsed in parallel
+while a single consumer does all collection writes.
+"""
+
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from .duplicates import ADD, DUPLICATE, DUPLICATE_IN_FILE, SKIP, SYNC, UPDATE
+from .mapping import positional
+from .media import MediaResult
+from .profiling import phase
+from .sync import CHANGED, NO_KEY, UNCHANGED
+
+try:
+    from anki.collection import AddNoteRequest
+except ImportError:  # Anki < 23.10 has no bulk add
+    AddNoteRequest = None
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportResult:
+    added: int = 0
+    skipped_empty: int = 0
+    cancelled: bool = False
+    # Duplicate handling: how rows were classified and what happened to them
+    policy: str = ADD
+    duplicates: int = 0
+    duplicates_in_file: int = 0
+    updated: int = 0
+    skipped_duplicates: int = 0
+    # Sync: rows identical to their note, and notes tagged missing afterwards
+    unchanged: int = 0
+    missing: int = 0
+    media: MediaResult | None = None  # referenced media files, if collected
+    last_note_id: int = 0  # newest note added, see journal.Journal.load
+
+    @property
+    def rows_seen(self) -> int:
+        return (
+            self.added + self.skipped_empty + self.updated + self.skipped_duplicates
+            + self.unchanged
+        )
+
+
+def skip_header(rows):
+    """Drop the first row, unless it is the only one (matches the old list slicing)."""
+    it = iter(rows)
+    first = next(it, None)
+    if first is None:
+        return
+    second = next(it, None)
+    if second is None:
+        yield first
+        return
+    yield second
+    yield from it
+
+
+def batched(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_empty_row(row) -> bool:
+    return not row or all(not c.strip() for c in row)
+
+
+def fill_note(note, fields, tags):
+    """Apply a mapped row (see mapping.py); None fields are left alone."""
+    for i, val in enumerate(fields):
+        if val is not None:
+            note.fields[i] = val
+    if tags:
+        note.tags = tags
+    return note
+
+
+def add_notes(col, notes, deck_id):
+    """Commit one batch of new notes in a single collection transaction."""
+    if AddNoteRequest is None:
+        for note in notes:
+            col.add_note(note, deck_id)
+        return
+    col.add_notes([AddNoteRequest(note=note, deck_id=deck_id) for note in notes])
+
+
+class NoteWriter:
+    """Turns row batches into notes for one deck/note type and commits them.
+
+    Each write() is one add_notes (plus update_notes) call, i.e. one
+    transaction. With a DuplicateIndex, rows whose first field already
+    exists are skipped, update the existing note, or are added anyway
+    depending on `policy`; repeats within the file are only added under ADD.
+    Under SYNC, `duplicates` is a SyncIndex and only new or changed rows
+    are written. `map_row` turns a csv row into (fields, tags), see
+    mapping.py; the default maps columns in order. With a MediaCollector,
+    media references into subfolders are cut to the file name and the
+    fields of every written note are scanned for media references.
+    """
+
+    def __init__(self, col, notetype, deck_id, duplicates=None, policy: str = ADD,
+                 profile=None, map_row=None, media=None):
+        self.col = col
+        self.notetype = notetype
+        self.deck_id = deck_id
+        self.duplicates = duplicates
+        self.policy = policy if duplicates is not None else ADD
+        self.field_count = len(notetype["flds"])
+        self.map_row = map_row or positional(self.field_count)
+        self.media = media
+        self.result = ImportResult(policy=self.policy)
+        self.profile = profile
+
+    def write(self, batch):
+        col = self.col
+        result = self.result
+        map_row = self.map_row
+        media = self.media
+        profile = self.profile
+        notes = []
+        updates = []
+        with phase(profile, "build notes"):
+            for row in batch:
+                if is_empty_row(row):
+                    result.skipped_empty += 1
+                    continue
+                fields, tags = map_row(row)
+                if media is not None:
+                    # Before duplicate and sync checks, which compare stored values
+                    fields = media.flatten(fields)
+                if self.policy == SYNC:
+                    if self.sync_row(fields, tags, updates):
+                        continue
+                elif self.duplicates is not None:
+                    kind, nid = self.duplicates.classify((fields[0] or "") if fields else "")
+                    if kind == DUPLICATE:
+                        result.duplicates += 1
+                        if self.policy == UPDATE:
+                            updates.append(fill_note(col.get_note(nid), fields, tags))
+                            if media is not None:
+                                media.scan(fields)
+                            continue
+                        if self.policy == SKIP:
+                            result.skipped_duplicates += 1
+                            continue
+                    elif kind == DUPLICATE_IN_FILE:
+                        result.duplicates_in_file += 1
+                        if self.policy != ADD:
+                            result.skipped_duplicates += 1
+                            continue
+                notes.append(fill_note(col.new_note(self.notetype), fields, tags))
+                if media is not None:
+                    media.scan(fields)
+        if notes:
+            with phase(profile, "add notes"):
+                add_notes(col, notes, self.deck_id)
+            result.added += len(notes)
+            result.last_note_id = notes[-1].id
+        if updates:
+            with phase(profile, "update notes"):
+                col.update_notes(updates)
+            result.updated += len(updates)
+        if profile is not None:
+            profile.count("rows", len(batch))
+            profile.count("batches")
+
+    def sync_row(self, fields, tags, updates) -> bool:
+        """Classify a row under SYNC; False if it should be added as a new note."""
+        result = self.result
+        kind, nid = self.duplicates.classify(fields, tags)
+        if kind == NO_KEY or kind == DUPLICATE_IN_FILE:
+            if kind == DUPLICATE_IN_FILE:
+                result.duplicates_in_file += 1
+            result.skipped_duplicates += 1
+            return True
+        if kind == CHANGED:
+            result.duplicates += 1
+            updates.append(fill_note(self.col.get_note(nid), fields, tags))
+            if self.media is not None:
+                self.media.scan(fields)
+            return True
+        if kind == UNCHANGED:
+            result.duplicates += 1
+            result.unchanged += 1
+            return True
+        return False
+
+
+def import_rows(
+    col,
+    notetype,
+    deck_id,
+    rows,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress=None,
+    should_cancel=None,
+    duplicates=None,
+    policy: str = ADD,
+    profile=None,
+    checkpoint=None,
+    map_row=None,
+    media=None,
+) -> ImportResult:
+    """Add one note per non-empty row, `batch_size` notes per transaction.
+
+    `progress(rows_seen)` and `checkpoint(result)` are called after every
+    committed batch and `should_cancel()` is checked before each one, so a
+    cancelled import keeps exactly the batches that were already committed.
+    """
+    writer = NoteWriter(col, notetype, deck_id, duplicates, policy, profile, map_row, media)
+    batches = batched(rows, batch_size)
+    while True:
+        # Reading, decoding and csv parsing all happen lazily in here
+        with phase(profile, "parse"):
+            batch = next(batches, None)
+        if batch is None:
+            break
+        if should_cancel and should_cancel():
+            writer.result.cancelled = True
+            break
+        writer.write(batch)
+        if checkpoint:
+            checkpoint(writer.result)
+        if progress:
+            progress(writer.result.rows_seen)
+    return writer.result
+
+
+# -------------------- Multi-file imports --------------------
+_DONE = object()
+
+
+def parallel_batches(sources, batch_size: int = DEFAULT_BATCH_SIZE,
+                     max_workers: int | None = None, queue_size: int = 8):
+    """Parse several row sources on a thread pool; yield (key, batch).
+
+    `sources` is a list of (key, make_rows) where make_rows() returns a row
+    iterator. Workers read, decode and parse in parallel and hand batches
+    over a bounded queue, so memory stays flat and the consumer (the only
+    thread that writes to the collection) gets batches as they are ready.
+    """
+    if not sources:
+        return
+    q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(key, make_rows):
+        try:
+            for batch in batched(make_rows(), batch_size):
+                if not put((key, batch, None)):
+                    return
+        except Exception as e:
+            put((key, None, e))
+            return
+        put((key, _DONE, None))
+
+    workers = max_workers or min(len(sources), os.cpu_count() or 1, 8)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key, make_rows in sources:
+            pool.submit(produce, key, make_rows)
+        remaining = len(sources)
+        try:
+            while remaining:
+                key, batch, error = q.get()
+                if error is not None:
+                    raise error
+                if batch is _DONE:
+                    remaining -= 1
+                    continue
+                yield key, batch
+        finally:
+            # Unblocks workers waiting on a full queue
+            stop.set()
+
+
+@dataclass
+class FileJob:
+    """One file of a multi-file import and where its rows go."""
+
+    path: str
+    make_rows: Callable
+    writer: NoteWriter
+
+
+def import_files(col, jobs, batch_size: int = DEFAULT_BATCH_SIZE, progress=None,
+                 should_cancel=None, max_workers: int | None = None, profile=None):
+    """Import several files at once: parsing runs in parallel, while writes
+    are serialized here, one batch (= one transaction) at a time.
+    Results end up in each job's writer.result.
+    """
+    done = 0
+    batches = parallel_batches(
+        [(i, job.make_rows) for i, job in enumerate(jobs)], batch_size, max_workers
+    )
+    try:
+        while True:
+            # Parsing runs on the workers; this is the time spent waiting for it
+            with phase(profile, "parse (wait)"):
+                item = next(batches, None)
+            if item is None:
+                break
+            i, batch = item
+            if should_cancel and should_cancel():
+                for job in jobs:
+                    job.writer.result.cancelled = True
+                break
+            result = jobs[i].writer.result
+            before = result.rows_seen
+            jobs[i].writer.write(batch)
+            done += result.rows_seen - before
+            if progress:
+                progress(done)
+    finally:
+        batches.close()
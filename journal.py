@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Checkpoint journal for resumable Quick Imports.
+
+While a file is imported, a small JSON file in user_files/journal records
+after every committed batch where the next row starts (byte offset and row
+number) plus the target deck and note type. If Anki crashes or the import
+is cancelled, the journal survives, and the next import of the same file
+can seek straight to that offset instead of re-adding the rows before it.
+The journal is deleted once the file has been imported completely.
+
+Files are recognised by a fingerprint of their size, head and tail, so a
+file that has been changed in the meantime is not resumed.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+
+from . import sources
+
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files", "journal")
+FINGERPRINT_BYTES = 1024 * 1024
+
+
+def fingerprint(path: str) -> str:
+    """Hash of the size and the first and last MB; cheap even for huge files."""
+    h = hashlib.sha256()
+    # Compressed files and zip archives are fingerprinted as stored on disk
+    with open(sources.container(path), "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(str(size).encode())
+        h.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            h.update(f.read())
+    return h.hexdigest()
+
+
+@dataclass
+class Checkpoint:
+    path: str
+    fingerprint: str
+    deck_id: int
+    deck: str
+    notetype_id: int
+    notetype: str
+    delimiter: str
+    encoding: str
+    byte_offset: int  # where the next row starts
+    row: int = 0  # rows of the file consumed so far, header included
+    added: int = 0
+    updated: int = 0
+    last_note_id: int = 0  # newest note added so far; gone if the import was undone
+    updated_at: str = ""
+
+    @property
+    def next_row(self) -> int:
+        """1-based number of the first row a resume imports."""
+        return self.row + 1
+
+
+class Journal:
+    def __init__(self, directory: str = JOURNAL_DIR):
+        self.directory = directory
+
+    def _file(self, path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, path: str, col=None) -> Checkpoint | None:
+        """The checkpoint for `path`, if one exists and the file is unchanged.
+
+        With `col`, a checkpoint whose last added note is no longer in the
+        collection (the import was undone or its notes deleted) is dropped
+        too; resuming it would skip rows that are not there anymore.
+        """
+        try:
+            with open(self._file(path), encoding="utf-8") as f:
+                data = json.load(f)
+            known = {f.name for f in fields(Checkpoint)}
+            checkpoint = Checkpoint(**{k: v for k, v in data.items() if k in known})
+        except (OSError, ValueError, TypeError):
+            return None
+        try:
+            if checkpoint.fingerprint != fingerprint(path):
+                self.clear(path)
+                return None
+        except OSError:
+            return None
+        if col is not None and checkpoint.last_note_id and not col.db.scalar(
+            "select 1 from notes where id = ?", checkpoint.last_note_id
+        ):
+            self.clear(path)
+            return None
+        return checkpoint
+
+    def save(self, checkpoint: Checkpoint):
+        checkpoint.updated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        os.makedirs(self.directory, exist_ok=True)
+        target = self._file(checkpoint.path)
+        tmp = target + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f)
+        # Atomic: a crash leaves either the old or the new checkpoint
+        os.replace(tmp, target)
+
+    def clear(self, path: str):
+        try:
+            os.remove(self._file(path))
+        except OSError:
+            pass
+
+
+journal = Journal()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Column -> field/tags mapping for Quick Import.
+
+Without a mapping, columns fill the note's fields in order and one extra
+last column holds space-separated tags. A mapping spec reorders, combines,
+drops or replaces columns, one entry per target:
+
+    Front=2, Back=1+3|br, Source="Word list", tags=4|prefix:vocab::
+
+Targets are field names (or 1-based field numbers) and `tags`. Sources are
+1-based columns, several joined with `+` (space-separated), or a quoted
+constant. Column values are stripped unless `raw` is given; further steps
+are `html` (escape <, >, &), `br` (line breaks -> <br>) and, for tags,
+`prefix:<text>`. Fields without an entry are left alone.
+
+The spec is parsed and compiled once per import into a list of closures,
+so mapping a row is a handful of plain calls: no dict lookups by name and
+no regexes per row.
+"""
+
+import html
+import re
+
+TAGS = "tags"
+
+_ENTRY_SPLIT_RE = re.compile(r',(?=(?:[^"]*"[^"]*")*[^"]*$)')
+_STEP_SPLIT_RE = re.compile(r'\|(?=(?:[^"]*"[^"]*")*[^"]*$)')
+_COLUMNS_RE = re.compile(r"^\d+(?:\s*\+\s*\d+)*$")
+
+
+def _html(s: str) -> str:
+    return html.escape(s, quote=False)
+
+
+def _br(s: str) -> str:
+    return s.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "<br>")
+
+
+VALUE_STEPS = {"html": _html, "br": _br, "strip": str.strip}
+
+
+def positional(field_count: int):
+    """The default mapping: columns in field order, extra last column = tags."""
+    def map_row(row):
+        fields = [v.strip() for v in row[:field_count]]
+        if len(fields) < field_count:
+            fields += [None] * (field_count - len(fields))
+        tags = row[-1].split() if len(row) > field_count else None
+        return fields, tags
+
+    return map_row
+
+
+def _is_constant(text: str) -> bool:
+    return len(text) >= 2 and text[0] == text[-1] == '"'
+
+
+def _source_columns(text: str, target: str) -> list:
+    """0-based columns a (stripped, non-constant) source reads."""
+    if not _COLUMNS_RE.match(text):
+        raise ValueError(f"Mapping for {target}: expected column number(s) or a quoted text, "
+                         f"got {text!r}.")
+    columns = [int(c) - 1 for c in text.split("+")]
+    if any(c < 0 for c in columns):
+        raise ValueError(f"Mapping for {target}: columns are numbered from 1.")
+    return columns
+
+
+def _source(text: str, target: str):
+    """Closure returning the raw value of a source, or None if the row is short."""
+    text = text.strip()
+    if _is_constant(text):
+        constant = text[1:-1]
+        return lambda row: constant
+    columns = _source_columns(text, target)
+    if len(columns) == 1:
+        (c,) = columns
+
+        def one(row):
+            return row[c] if c < len(row) else None
+        return one
+    last = max(columns)
+
+    def joined(row):
+        if last >= len(row):
+            present = [row[c].strip() for c in columns if c < len(row)]
+            return " ".join(v for v in present if v) if present else None
+        return " ".join(v for v in (row[c].strip() for c in columns) if v)
+    return joined
+
+
+def _chain(source, steps):
+    if not steps:
+        return source
+    if len(steps) == 1:
+        (step,) = steps
+
+        def apply_one(row):
+            v = source(row)
+            return None if v is None else step(v)
+        return apply_one
+
+    def apply(row):
+        v = source(row)
+        if v is None:
+            return None
+        for step in steps:
+            v = step(v)
+        return v
+    return apply
+
+
+def _field_index(target: str, field_names: list) -> int:
+    if target.isdigit():
+        i = int(target) - 1
+        if 0 <= i < len(field_names):
+            return i
+    else:
+        lowered = [n.strip().lower() for n in field_names]
+        if target.lower() in lowered:
+            return lowered.index(target.lower())
+    raise ValueError(f"Mapping: the note type has no field {target!r} "
+                     f"(fields: {', '.join(field_names)}).")
+
+
+def _entries(spec: str, field_names: list):
+    """(field index or TAGS, source text, step names) per entry of `spec`."""
+    for entry in _ENTRY_SPLIT_RE.split(spec):
+        if not entry.strip():
+            continue
+        target, sep, rest = entry.partition("=")
+        target = target.strip()
+        if not sep or not target:
+            raise ValueError(f"Mapping entry {entry.strip()!r} should look like Field=column.")
+        source_text, *step_names = [p.strip() for p in _STEP_SPLIT_RE.split(rest)]
+        if target.lower() == TAGS:
+            yield TAGS, source_text, step_names
+        else:
+            yield _field_index(target, field_names), source_text, step_names
+
+
+def compile_mapping(spec: str | None, field_names: list):
+    """Row -> (fields, tags) function for `spec`; fields holds None for
+    fields to leave alone, tags is None when the row sets none."""
+    if not spec or not spec.strip():
+        return positional(len(field_names))
+    getters = [None] * len(field_names)
+    tag_getter = None
+    for target, source_text, step_names in _entries(spec, field_names):
+        is_tags = target == TAGS
+        name_for_errors = "tags" if is_tags else field_names[target]
+        steps = []
+        strip = True
+        prefix = ""
+        for name in step_names:
+            if name == "raw":
+                strip = False
+            elif name.startswith("prefix:") and is_tags:
+                prefix = name[len("prefix:"):]
+            elif name in VALUE_STEPS and not is_tags:
+                steps.append(VALUE_STEPS[name])
+            else:
+                raise ValueError(f"Mapping for {name_for_errors}: unknown step {name!r}.")
+        if strip:
+            steps.insert(0, str.strip)
+        getter = _chain(_source(source_text, name_for_errors), steps)
+        if is_tags:
+            tag_getter = _tags(getter, prefix)
+        else:
+            getters[target] = getter
+    getters = [g or (lambda row: None) for g in getters]
+
+    if tag_getter is None:
+        def map_row(row):
+            return [g(row) for g in getters], None
+    else:
+        def map_row(row):
+            return [g(row) for g in getters], tag_getter(row)
+    return map_row
+
+
+def column_layout(spec: str | None, field_names: list) -> dict | None:
+    """Column -> names of the fields (or "Tags") `spec` fills from it, for
+    labelling a preview; None when `spec` is empty (columns in field order).
+    Raises ValueError like compile_mapping."""
+    if not spec or not spec.strip():
+        return None
+    layout = {}
+    for target, source_text, _ in _entries(spec, field_names):
+        source_text = source_text.strip()
+        if _is_constant(source_text):
+            continue
+        label = "Tags" if target == TAGS else field_names[target]
+        for column in _source_columns(source_text, label):
+            layout.setdefault(column, []).append(label)
+    return layout
+
+
+def with_file_options(map_row, escape_html: bool = False, extra_tags=()):
+    """Wrap a compiled mapping for #html:false and #tags: directives."""
+    if not escape_html and not extra_tags:
+        return map_row
+    extra_tags = list(extra_tags)
+
+    def wrapped(row):
+        fields, tags = map_row(row)
+        if escape_html:
+            fields = [None if v is None else _html(v) for v in fields]
+        if extra_tags:
+            tags = (tags or []) + extra_tags
+        return fields, tags
+    return wrapped
+
+
+def _tags(getter, prefix: str):
+    if not prefix:
+        def tags(row):
+            v = getter(row)
+            return v.split() if v else None
+        return tags
+
+    def prefixed(row):
+        v = getter(row)
+        return [prefix + t for t in v.split()] if v else None
+    return prefixed
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""
+Copying media referenced by imported notes into the collection.
+
+Fields are scanned as rows are turned into notes; every file referenced
+with <img src="..."> or [sound:...] is looked up in the CSV's folder (never
+outside it) and copied into the collection's media folder on a small
+thread pool while the import goes on. A file already in the media folder
+is only copied if its content differs (compared by size, then SHA-1); if
+a different file of the same name is there, it is kept and the reference
+counted as a conflict. The media folder is flat, so a reference into a
+subfolder (img/a.png) is rewritten to the file name alone before the note
+is built, and the file is copied under that name.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import unquote
+
+from . import sources
+
+MEDIA_REF_RE = re.compile(
+    r"""<img\b[^>]*?\bsrc\s*=\s*(?:"([^"]+)"|'([^']+)'|([^\s>]+))|\[sound:([^\]]+)\]""",
+    re.IGNORECASE,
+)
+HASH_CHUNK_SIZE = 1024 * 1024
+COPIED, PRESENT, MISSING, CONFLICT = "copied", "present", "missing", "conflict"
+
+
+@dataclass
+class MediaResult:
+    copied: int = 0
+    present: int = 0  # identical file already in the media folder
+    missing: int = 0
+    conflicts: int = 0  # a different file of the same name is already there
+
+
+def media_refs(value: str):
+    """File names referenced in a field value (remote URLs excluded)."""
+    for m in MEDIA_REF_RE.finditer(value):
+        name = unquote(next(g for g in m.groups() if g)).strip()
+        if name and "://" not in name and not name.startswith("data:"):
+            yield name
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def same_content(a: str, b: str) -> bool:
+    return os.path.getsize(a) == os.path.getsize(b) and file_hash(a) == file_hash(b)
+
+
+def _relative(name: str) -> bool:
+    """False for names that are absolute or climb out with `..`."""
+    if ".." in name or os.path.isabs(name) or name.startswith(("/", "\\")):
+        return False
+    return not os.path.splitdrive(name)[0]
+
+
+def flat_name(name: str) -> str:
+    return name.replace("\\", "/").rsplit("/", 1)[-1]
+
+
+def flatten_refs(value: str, renamed: dict) -> str:
+    """`value` with media references into subfolders cut to the file name;
+    `renamed` maps each new name to the one it came from, and a reference
+    whose file name is already taken by another subfolder is left as is."""
+    if "/" not in value and "\\" not in value:
+        return value
+
+    def flatten(m):
+        i = next(i for i, g in enumerate(m.groups(), 1) if g)
+        raw = m.group(i).strip()
+        name = unquote(raw)
+        if "://" in name or name.startswith("data:") or not _relative(name):
+            return m.group(0)  # counted as missing if local
+        if "/" not in name and "\\" not in name:
+            return m.group(0)
+        if renamed.setdefault(flat_name(name), name) != name:
+            return m.group(0)
+        start, end = m.start(i) - m.start(), m.end(i) - m.start()
+        return m.group(0)[:start] + flat_name(raw) + m.group(0)[end:]
+
+    return MEDIA_REF_RE.sub(flatten, value)
+
+
+def source_path(name: str, source_dir: str) -> str | None:
+    """Where a referenced file lives, or None if the name would reach outside
+    the CSV's folder (absolute, `..`, or a symlink pointing elsewhere); names
+    come from the CSV, and the media folder is synced to AnkiWeb."""
+    if not _relative(name):
+        return None
+    root = os.path.realpath(source_dir)
+    source = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, source]) != root:
+        return None
+    return source
+
+
+def copy_media_file(name: str, source_dir: str, media_dir: str) -> str:
+    """Copy one referenced file; returns COPIED, PRESENT, MISSING or CONFLICT."""
+    source = source_path(name, source_dir)
+    if source is None or not os.path.isfile(source):
+        return MISSING
+    target = os.path.join(media_dir, flat_name(name))
+    if os.path.exists(target):
+        return PRESENT if same_content(source, target) else CONFLICT
+    shutil.copyfile(source, target)
+    return COPIED
+
+
+class MediaCollector:
+    """Collects media references from mapped rows and copies each file once."""
+
+    def __init__(self, source_dir: str, media_dir: str, max_workers: int = 4):
+        self.source_dir = source_dir
+        self.media_dir = media_dir
+        self._seen = set()
+        self._renamed = {}  # flat name -> subfolder reference it replaced
+        self._futures = []
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+
+    def flatten(self, fields):
+        """Mapped fields with subfolder references rewritten (see flatten_refs)."""
+        return [
+            flatten_refs(value, self._renamed)
+            if value and ("src" in value or "[sound:" in value) else value
+            for value in fields
+        ]
+
+    def scan(self, fields):
+        for value in fields:
+            # Cheap test first; most fields reference nothing
+            if value and ("src" in value or "[sound:" in value):
+                for name in media_refs(value):
+                    self.add(name)
+
+    def add(self, name: str):
+        with self._lock:
+            if name in self._seen:
+                return
+            self._seen.add(name)
+            self._futures.append(self._pool.submit(
+                copy_media_file, self._renamed.get(name, name), self.source_dir, self.media_dir
+            ))
+
+    def finish(self) -> MediaResult:
+        """Wait for the copies and count the outcomes."""
+        self._pool.shutdown(wait=True)
+        result = MediaResult()
+        for future in self._futures:
+            try:
+                outcome = future.result()
+            except OSError:
+                outcome = MISSING
+            if outcome == COPIED:
+                result.copied += 1
+            elif outcome == PRESENT:
+                result.present += 1
+            elif outcome == CONFLICT:
+                result.conflicts += 1
+            else:
+                result.missing += 1
+        return result
+
+
+def media_collector(col, csv_path: str) -> MediaCollector | None:
+    """Collector for media next to `csv_path`, or None without a media folder."""
+    try:
+        media_dir = col.media.dir()
+    except Exception:
+        return None
+    folder = os.path.dirname(os.path.abspath(sources.container(csv_path)))
+    return MediaCollector(folder, media_dir)
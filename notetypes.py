@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+Note-type schema index used to auto-pick a note type from CSV headers.
+
+Fetching every note type and normalizing its field names on each status
+refresh is slow on collections with hundreds of note types. NoteTypeIndex
+builds an inverted index from normalized field name (and its substrings) to
+note types once, and is invalidated through the note-type change hooks.
+"""
+
+import re
+import threading
+
+
+_SEPARATORS_RE = re.compile(r"[\s_\-]+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(s: str) -> str:
+    s = s.strip().lower()
+    s = _SEPARATORS_RE.sub(" ", s)
+    s = _NON_ALNUM_RE.sub("", s)
+    return s
+
+
+def substrings(s: str):
+    n = len(s)
+    return {s[i:j] for i in range(n) for j in range(i + 1, n + 1)}
+
+
+def column_score(observed_cols: int, field_count: int) -> int:
+    # column closeness
+    diff = abs(observed_cols - field_count)
+    if diff == 0:
+        return 3
+    if diff == 1:
+        return 2
+    if diff == 2:
+        return 1
+    return 0
+
+
+class _Schema:
+    """Immutable snapshot of the collection's note types."""
+
+    def __init__(self, col):
+        self.infos = []  # (note type id, name, field count)
+        self.exact = {}  # normalized field name -> {info index}
+        self.containing = {}  # substring of a field name -> {info index}
+        self.first_by_count = {}  # field count -> first info index
+        for m in col.models.all_names_and_ids():
+            try:
+                nt = col.models.get(m.id)
+                field_names = [f["name"] for f in nt["flds"]]
+            except Exception:
+                continue
+            pos = len(self.infos)
+            self.infos.append((m.id, m.name, len(field_names)))
+            self.first_by_count.setdefault(len(field_names), pos)
+            for name in {normalize_name(x) for x in field_names}:
+                if not name:
+                    continue
+                self.exact.setdefault(name, set()).add(pos)
+                for sub in substrings(name):
+                    self.containing.setdefault(sub, set()).add(pos)
+
+    def header_scores(self, header_norm) -> dict:
+        """Name-similarity score per candidate note type (others score 0)."""
+        scores = {}
+        empty = frozenset()
+        for h in header_norm:
+            if not h:
+                continue
+            exact = self.exact.get(h, empty)
+            # h is part of a field name, or a field name is part of h
+            partial = set(self.containing.get(h, empty))
+            for sub in substrings(h):
+                partial.update(self.exact.get(sub, empty))
+            for pos in exact:
+                scores[pos] = scores.get(pos, 0) + 3
+            for pos in partial - exact:
+                scores[pos] = scores.get(pos, 0) + 1
+        return scores
+
+    def best_match(self, header_norm, observed_cols: int):
+        if not self.infos:
+            return None
+        scores = self.header_scores(header_norm)
+        if scores:
+            # Any name match outranks every note type without one
+            candidates = ((score, pos) for pos, score in scores.items())
+        else:
+            # Nothing matched by name: only the field count matters, and the
+            # first note type with a given count wins ties.
+            candidates = ((0, pos) for pos in self.first_by_count.values())
+        best = None
+        best_pos = None
+        for score_name, pos in candidates:
+            field_count = self.infos[pos][2]
+            key = (score_name, column_score(observed_cols, field_count), -field_count, -pos)
+            if best is None or key > best:
+                best = key
+                best_pos = pos
+        return self.infos[best_pos]
+
+
+class NoteTypeIndex:
+    """Lazily built, hook-invalidated cache of a _Schema snapshot."""
+
+    def __init__(self):
+        self._schema = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_args):
+        self._schema = None
+
+    def schema(self, col) -> _Schema:
+        schema = self._schema
+        if schema is not None:
+            return schema
+        with self._lock:
+            if self._schema is None:
+                self._schema = _Schema(col)
+            return self._schema
+
+    def best_match(self, col, header, observed_cols: int):
+        """Return (id, name, field count) of the best-fitting note type.
+
+        An id rather than a list position: callers hold their own lists of
+        note types, which may be refreshed at other times than this index.
+        """
+        header_norm = [normalize_name(h) for h in (header or [])]
+        return self.schema(col).best_match(header_norm, observed_cols)
+
+    def on_operation_did_execute(self, changes, handler):
+        if getattr(changes, "notetype", False):
+            self.invalidate()
+
+
+note_type_index = NoteTypeIndex()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parallel CSV parsing for very large files.
+
+The memory-mapped file is cut into row-aligned byte ranges (never inside a
+quoted field, see rowcount.row_ranges), the ranges are parsed by csv.reader
+in a process pool, and the rows come back in file order. Only a bounded
+number of ranges is in flight, so memory stays flat however large the file.
+
+ParallelReader has the same (rows, tell) shape as FileAnalysis.tracked_reader:
+each row comes with the byte offset where the next one starts, so journaled
+imports can checkpoint after any batch.
+
+Processes are started with "spawn" (forking a Qt application is unsafe).
+Frozen builds cannot spawn the interpreter, so they parse serially.
+"""
+
+import csv
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import rowcount
+
+PARSE_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+
+
+def parse_range(path: str, start: int, end: int, codec: str, delimiter: str):
+    """Parse file[start:end]; returns (rows, byte offset after each row).
+
+    Runs in a worker process. Lines are split on raw bytes and decoded one
+    by one, which is valid for ASCII-compatible codecs since no multi-byte
+    sequence contains a line break byte.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    pos = start
+
+    def lines():
+        nonlocal pos
+        for line in data.splitlines(keepends=True):
+            pos += len(line)
+            yield line.decode(codec, errors="replace")
+
+    rows = []
+    ends = []
+    # csv.reader never reads ahead, so `pos` is where the next row starts
+    for row in csv.reader(lines(), delimiter=delimiter):
+        rows.append(row)
+        ends.append(pos)
+    return rows, ends
+
+
+def can_spawn() -> bool:
+    return not getattr(sys, "frozen", False)
+
+
+def use_parallel(analysis, delimiter: str, min_bytes: int | None,
+                 start: int | None = None) -> bool:
+    """True if the rest of the file is big enough and parseable in ranges."""
+    if min_bytes is None or not can_spawn() or (os.cpu_count() or 1) < 2:
+        return False
+    if not (analysis.has_data() and analysis.byte_countable and len(delimiter) == 1):
+        return False
+    begin = analysis.data_byte_offset if start is None else start
+    return analysis.data_byte_end - begin >= min_bytes
+
+
+class ParallelReader:
+    """Rows of a FileAnalysis from `start` on, parsed in a process pool.
+
+    Iterate for rows; tell() is the byte offset where the next row starts.
+    """
+
+    def __init__(self, analysis, delimiter: str, start: int | None = None,
+                 max_workers: int | None = None, chunk_bytes: int = PARSE_CHUNK_BYTES):
+        self.analysis = analysis
+        self.delimiter = delimiter
+        self.start = analysis.data_byte_offset if start is None else start
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 8)
+        self.chunk_bytes = chunk_bytes
+        self._offset = self.start
+        self._rows = self._iter_rows()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def _iter_rows(self):
+        analysis = self.analysis
+        mm = rowcount.open_mmap(analysis.path)
+        if mm is None:
+            return
+        pool = ProcessPoolExecutor(
+            self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            ranges = rowcount.row_ranges(
+                mm, self.start, analysis.data_byte_end, self.delimiter, self.chunk_bytes
+            )
+            pending = deque()
+            for begin, end in ranges:
+                pending.append(pool.submit(
+                    parse_range, analysis.path, begin, end, analysis.codec, self.delimiter
+                ))
+                # Keep every worker busy, but no more than that queued
+                if len(pending) >= 2 * self.max_workers:
+                    yield from self._drain(pending.popleft())
+            while pending:
+                yield from self._drain(pending.popleft())
+        except BrokenProcessPool:
+            if self._offset != self.start:
+                raise
+            # Could not start workers at all: parse serially instead
+            rows, tell = analysis.tracked_reader(self.delimiter, self.start)
+            for row in rows:
+                self._offset = tell()
+                yield row
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            mm.close()
+
+    def _drain(self, future):
+        rows, ends = future.result()
+        for row, end in zip(rows, ends):
+            self._offset = end
+            yield row
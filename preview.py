@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Virtualized preview of the selected CSV.
+
+The table model only parses the rows the view asks for: rows are read in
+blocks of RowIndex.step starting from the byte offset of the block's first
+row, and a few recent blocks are kept. Until the background RowIndex is
+ready only the first block (which starts at the first data row) is shown.
+Columns are labelled the way Quick Import maps them: with a column mapping
+(see mapping.column_layout) by the fields each column fills, otherwise
+note type fields in order, then the last extra column as tags.
+"""
+
+from collections import OrderedDict
+
+from aqt.qt import QAbstractTableModel, QModelIndex, Qt
+
+from .analysis import ROW_INDEX_STEP
+
+MAX_CACHED_BLOCKS = 8
+HEAD_SAMPLE_ROWS = 21
+
+
+class PreviewModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._analysis = None
+        self._delimiter = ","
+        self._has_header = False
+        self._header = []  # header row from the file, if any
+        self._index = None
+        self._rows = 0
+        self._columns = 0
+        self._field_names = []
+        self._layout = None  # column -> field names, None for columns in field order
+        self._blocks = OrderedDict()
+
+    # -------------------- Source --------------------
+    def clear(self):
+        self.beginResetModel()
+        self._analysis = None
+        self._index = None
+        self._header = []
+        self._rows = 0
+        self._columns = 0
+        self._blocks.clear()
+        self.endResetModel()
+
+    def set_source(self, analysis, delimiter: str, has_header: bool, field_names,
+                   layout=None):
+        """Show `analysis`; only the first block until set_row_index()."""
+        self.beginResetModel()
+        self._analysis = analysis
+        self._delimiter = delimiter
+        self._has_header = has_header
+        self._field_names = list(field_names)
+        self._layout = layout
+        self._index = None
+        self._blocks.clear()
+        try:
+            head = analysis.head_rows(delimiter, HEAD_SAMPLE_ROWS)
+        except Exception:
+            head = []
+        self._header = head[0] if has_header and head else []
+        self._columns = max([len(r) for r in head] + [self._mapped_columns()])
+        first_block = self._block(0)
+        self._rows = max(len(first_block) - self._skip(), 0)
+        self.endResetModel()
+
+    def set_row_index(self, analysis, delimiter: str, index):
+        """Switch to the full row count once the background index is built."""
+        if analysis is not self._analysis or delimiter != self._delimiter or index is None:
+            return
+        self.beginResetModel()
+        self._index = index
+        self._rows = max(index.rows - self._skip(), 0)
+        self.endResetModel()
+
+    def set_field_names(self, field_names, layout=None):
+        self._field_names = list(field_names)
+        self._layout = layout
+        if self._mapped_columns() > self._columns and self._analysis is not None:
+            self.beginResetModel()
+            self._columns = self._mapped_columns()
+            self.endResetModel()
+        elif self._columns:
+            self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, self._columns - 1)
+
+    def _mapped_columns(self) -> int:
+        """Columns the labels need, whether or not the file has them."""
+        if self._layout is not None:
+            return max(self._layout, default=-1) + 1
+        return len(self._field_names)
+
+    def is_complete(self) -> bool:
+        return self._index is not None
+
+    # -------------------- Lazy rows --------------------
+    def _skip(self) -> int:
+        return 1 if self._has_header and self._header else 0
+
+    def _block(self, number: int) -> list:
+        block = self._blocks.get(number)
+        if block is not None:
+            self._blocks.move_to_end(number)
+            return block
+        if number == 0:
+            offset = self._analysis.data_byte_offset
+        elif self._index is not None:
+            offset = self._index.offsets[number]
+        else:
+            return []
+        try:
+            block = self._analysis.rows_at(self._delimiter, offset, 0, ROW_INDEX_STEP)
+        except Exception:
+            block = []
+        self._blocks[number] = block
+        while len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+
+    def row(self, row: int) -> list:
+        file_row = row + self._skip()
+        block = self._block(file_row // ROW_INDEX_STEP)
+        i = file_row % ROW_INDEX_STEP
+        return block[i] if i < len(block) else []
+
+    # -------------------- Qt model --------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._columns
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (
+            Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole
+        ):
+            return None
+        values = self.row(index.row())
+        col = index.column()
+        if col >= len(values):
+            return None
+        value = values[col]
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Keep multi-line fields on one line in the grid
+            return value.replace("\r\n", " ⏎ ").replace("\n", " ⏎ ")
+        return value
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Vertical:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return str(section + 1)
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.column_label(section)
+        if role == Qt.ItemDataRole.ToolTipRole and section < len(self._header):
+            return f"CSV header: {self._header[section]}"
+        return None
+
+    def column_label(self, col: int) -> str:
+        if self._layout is not None:
+            return ", ".join(self._layout.get(col, ())) or "(ignored)"
+        field_count = len(self._field_names)
+        if col < field_count:
+            return self._field_names[col]
+        # Quick Import: the last column beyond the note type's fields is tags
+        if col == self._columns - 1:
+            return "Tags"
+        return "(not imported)"
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+Phase timers and counters for analysis and imports.
+
+A Profile collects wall time per named phase ("sniff", "add notes", ...)
+plus simple counters, optionally with the tracemalloc peak. Code that is
+instrumented takes `profile=None` and wraps its steps in
+`phase(profile, name)`, which costs nothing when profiling is off. Finished
+profiles are appended as JSON lines to user_files/profile.jsonl in the
+add-on folder, so slow imports can be looked at after the fact.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files")
+LOG_NAME = "profile.jsonl"
+MAX_LOG_BYTES = 1024 * 1024  # then rotated to profile.jsonl.1
+
+
+class Profile:
+    def __init__(self, operation: str, track_memory: bool = False):
+        self.operation = operation
+        self.info = {}  # free-form context: file, encoding, delimiter, ...
+        self.phases = {}  # name -> [seconds, calls]
+        self.counters = {}
+        self._order = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.total = None
+        self.peak_bytes = None
+        # tracemalloc is process-wide; only start it if nobody else did
+        self._tracing = track_memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.phases.get(name)
+            if entry is None:
+                entry = self.phases[name] = [0.0, 0]
+                self._order.append(name)
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        if self.total is not None:
+            return self
+        self.total = time.perf_counter() - self._started
+        if self._tracing:
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._tracing = False
+        return self
+
+    def record(self) -> dict:
+        self.finish()
+        out = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "operation": self.operation,
+            **self.info,
+            "total_seconds": round(self.total, 4),
+            "phases": {
+                name: {"seconds": round(self.phases[name][0], 4), "calls": self.phases[name][1]}
+                for name in self._order
+            },
+            "counters": dict(self.counters),
+        }
+        if self.peak_bytes is not None:
+            out["peak_mb"] = round(self.peak_bytes / 2**20, 2)
+        return out
+
+    def summary(self) -> str:
+        """One-line breakdown, slowest phases first."""
+        self.finish()
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda kv: kv[1][0], reverse=True)
+        parts = [f"{name} {format_seconds(seconds)}" for name, (seconds, _) in phases]
+        line = " • ".join(parts)
+        line += f" (total {format_seconds(self.total)}"
+        if self.peak_bytes is not None:
+            line += f", peak {self.peak_bytes / 2**20:.1f} MB"
+        return line + ")"
+
+
+def phase(profile: Profile | None, name: str):
+    """profile.phase(name), or a no-op when there is no profile."""
+    return profile.phase(name) if profile is not None else nullcontext()
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.2f} s"
+
+
+def log_path() -> str:
+    return os.path.join(LOG_DIR, LOG_NAME)
+
+
+def write_record(profile: Profile):
+    """Append the profile to the JSON-lines log; never raises."""
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        path = log_path()
+        try:
+            if os.path.getsize(path) > MAX_LOG_BYTES:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(profile.record(), ensure_ascii=False) + "\n")
+    except Exception:
+        pass
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fast, quote-aware row counting on raw bytes.
+
+Counting rows with csv.reader builds a Python list per row just to throw it
+away. Here the file is memory-mapped and scanned in large chunks: complete
+quoted fields are cut out with one regex substitution (so embedded newlines
+do not count), and the remaining newlines are counted with bytes.count().
+The result matches csv.reader's row count, blank lines included.
+The same quote-aware windows give row_ranges(), which cuts a file into
+row-aligned byte ranges for parallel parsing (parallel.py).
+
+Only valid for ASCII-compatible encodings (utf-8, cp1252, latin-1, ...).
+"""
+
+import mmap
+import os
+import re
+
+
+CHUNK_SIZE = 8 * 1024 * 1024
+SAMPLE_BYTES = 4 * 1024 * 1024
+_WHITESPACE = b" \t\r\n\x0b\x0c"
+
+_quoted_field_res = {}
+
+
+def _field_res(delimiter: str):
+    """(complete quoted field, quote opening a field) regexes for a delimiter."""
+    res = _quoted_field_res.get(delimiter)
+    if res is None:
+        d = re.escape(delimiter.encode("ascii"))
+        # A quote only opens a field right after a delimiter or line break,
+        # like csv.reader; quotes elsewhere are literal characters.
+        # (The lookbehind sits after the quote so the regex engine can scan
+        # for the literal quote byte instead of trying every position.)
+        opening = rb'"(?<![^' + d + rb'\n\r]")'
+        res = (
+            # "" inside the field is an escaped quote; a lone quote closes it
+            re.compile(opening + rb'[^"]*(?:""[^"]*)*"(?!")'),
+            re.compile(opening),
+        )
+        _quoted_field_res[delimiter] = res
+    return res
+
+
+def data_end(buf, start: int) -> int:
+    """Offset just past the last non-whitespace byte (like str.rstrip)."""
+    end = len(buf)
+    while end > start and buf[end - 1] in _WHITESPACE:
+        end -= 1
+    return end
+
+
+def count_rows_in(buf, start: int, end: int, delimiter: str = ",") -> int:
+    """Count csv rows in buf[start:end]; buf may be bytes or an mmap."""
+    if end <= start:
+        return 0
+    rows = 0
+    if buf.find(b'"', start, end) < 0:
+        pos = start
+        while pos < end:
+            stop = min(pos + CHUNK_SIZE, end)
+            rows += buf[pos:stop].count(b"\n")
+            pos = stop
+    else:
+        for _, _, cleaned, unterminated in _row_windows(buf, start, end, delimiter, CHUNK_SIZE):
+            if unterminated:
+                # csv.reader reads a never-closed quoted field up to EOF
+                return rows + cleaned.count(b"\n", 0, unterminated.start()) + 1
+            rows += cleaned.count(b"\n")
+    # The last line has no terminator after rstrip but is still a row
+    if buf[end - 1:end] != b"\n":
+        rows += 1
+    return rows
+
+
+def _row_windows(buf, start: int, end: int, delimiter: str, size: int):
+    """Yield (pos, stop, cleaned, unterminated) for consecutive windows of
+    about `size` bytes that begin and end at row starts.
+
+    `cleaned` is the window with complete quoted fields cut out;
+    `unterminated` matches a quote that is never closed before EOF (the last
+    window then runs to `end`).
+    """
+    quoted, opening = _field_res(delimiter)
+    pos = start
+    while pos < end:
+        stop = _next_line_end(buf, pos + size, end)
+        chunk = buf[pos:stop]
+        odd = chunk.count(b'"') % 2
+        while odd and stop < end:
+            # Cheap first guess: in well-formed CSV a line end with an
+            # odd number of quotes before it is inside a quoted field.
+            nxt = _next_line_end(buf, stop, end)
+            odd ^= buf[stop:nxt].count(b'"') % 2
+            stop = nxt
+        if len(chunk) != stop - pos:
+            chunk = buf[pos:stop]
+        cleaned = quoted.sub(b"", chunk)
+        span = stop - pos
+        unterminated = opening.search(cleaned)
+        while unterminated and stop < end:
+            # A quoted field runs past the cut: grow the window
+            # (doubling keeps this linear) and try again.
+            span *= 2
+            stop = _next_line_end(buf, pos + span, end)
+            cleaned = quoted.sub(b"", buf[pos:stop])
+            unterminated = opening.search(cleaned)
+        yield pos, stop, cleaned, unterminated
+        if unterminated:
+            return
+        pos = stop
+
+
+def row_ranges(buf, start: int, end: int, delimiter: str = ",", size: int = CHUNK_SIZE):
+    """Yield (start, stop) byte ranges of about `size` bytes covering
+    buf[start:end], cut only where a row starts, never inside a quoted field.
+    """
+    if end <= start:
+        return
+    if buf.find(b'"', start, end) < 0:
+        pos = start
+        while pos < end:
+            stop = _next_line_end(buf, pos + size, end)
+            yield pos, stop
+            pos = stop
+        return
+    for pos, stop, _, _ in _row_windows(buf, start, end, delimiter, size):
+        yield pos, stop
+
+
+def _next_line_end(buf, pos: int, end: int) -> int:
+    if pos >= end:
+        return end
+    nl = buf.find(b"\n", pos, end)
+    return end if nl < 0 else nl + 1
+
+
+def open_mmap(path: str):
+    """Read-only mmap of a file, or None for empty files."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def count_rows(path: str, start: int = 0, delimiter: str = ",") -> int:
+    """Exact row count of the file from byte offset `start`."""
+    mm = open_mmap(path)
+    if mm is None:
+        return 0
+    with mm:
+        return count_rows_in(mm, start, data_end(mm, start), delimiter)
+
+
+def estimate_rows(path: str, start: int = 0, delimiter: str = ",",
+                  sample_bytes: int = SAMPLE_BYTES) -> int:
+    """Extrapolate the row count from the first `sample_bytes` of data."""
+    mm = open_mmap(path)
+    if mm is None:
+        return 0
+    with mm:
+        end = data_end(mm, start)
+        if end - start <= sample_bytes:
+            return count_rows_in(mm, start, end, delimiter)
+        sample_end = _next_line_end(mm, start + sample_bytes, end)
+        sample_rows = count_rows_in(mm, start, sample_end, delimiter)
+        return round(sample_rows * (end - start) / (sample_end - start))
+
+
+def format_row_count(rows: int, estimated: bool = False) -> str:
+    if not estimated:
+        return f"{rows} row(s)"
+    for unit, size in (("B", 10**9), ("M", 10**6), ("K", 10**3)):
+        if rows >= size:
+            return f"~{rows / size:.1f}{unit} rows"
+    return f"~{rows} rows"
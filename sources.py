@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compressed CSV sources.
+
+A CSV may be a plain file, a .gz/.bz2/.xz file, or a member of a .zip
+archive, written as "archive.zip|member.csv" wherever a path is expected.
+open_binary() gives a seekable binary stream of the decompressed data for
+any of them, so detection reads only the first compressed block and imports
+decompress as they go; nothing is extracted to disk. Byte offsets into such
+sources refer to the decompressed data.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import zipfile
+
+MEMBER_SEP = "|"
+COMPRESSED_OPENERS = {
+    ".gz": gzip.GzipFile,
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+}
+CSV_SUFFIXES = (".csv", ".tsv", ".txt")
+FILE_DIALOG_FILTER = "CSV Files (*.csv *.csv.gz *.csv.bz2 *.csv.xz *.zip);;All Files (*)"
+
+
+def split_member(path: str) -> tuple[str, str | None]:
+    """(file on disk, zip member or None)."""
+    archive, sep, member = path.rpartition(MEMBER_SEP)
+    if sep and archive.lower().endswith(".zip") and os.path.isfile(archive):
+        return archive, member
+    return path, None
+
+
+def container(path: str) -> str:
+    """The file on disk that holds the CSV."""
+    return split_member(path)[0]
+
+
+def compression(path: str) -> str | None:
+    """".gz", ".bz2", ".xz", ".zip" or None for a plain file."""
+    if split_member(path)[1] is not None:
+        return ".zip"
+    suffix = os.path.splitext(path)[1].lower()
+    return suffix if suffix in COMPRESSED_OPENERS else None
+
+
+def is_compressed(path: str) -> bool:
+    return compression(path) is not None
+
+
+def stat(path: str) -> os.stat_result:
+    return os.stat(container(path))
+
+
+def open_binary(path: str, buffering: int = -1):
+    """Binary stream over the (decompressed) CSV data."""
+    archive, member = split_member(path)
+    if member is not None:
+        with zipfile.ZipFile(archive) as zf:
+            # The archive file stays open until the member stream is closed
+            return zf.open(member)
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1].lower())
+    if opener is None:
+        return open(path, "rb", buffering=buffering)
+    return opener(path, "rb")
+
+
+def sample(path: str, size: int) -> tuple[bytes, float]:
+    """First `size` decompressed bytes and the fraction of the whole file
+    they represent (from compressed bytes consumed, or the member size)."""
+    archive, member = split_member(path)
+    if member is not None:
+        with zipfile.ZipFile(archive) as zf:
+            total = zf.getinfo(member).file_size
+            with zf.open(member) as f:
+                data = f.read(size)
+        return data, (len(data) / total if total else 1.0)
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(path)[1].lower())
+    with open(path, "rb") as raw:
+        total = os.fstat(raw.fileno()).st_size
+        if opener is None:
+            data = raw.read(size)
+        else:
+            with _wrap(opener, raw) as f:
+                data = f.read(size)
+                if len(data) < size:
+                    return data, 1.0
+        return data, (raw.tell() / total if total else 1.0)
+
+
+def _wrap(opener, raw):
+    if opener is gzip.GzipFile:
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    return opener(raw, "rb")
+
+
+def display_name(path: str) -> str:
+    """File name without directory, compression suffix or .csv extension."""
+    member = split_member(path)[1]
+    name = os.path.basename(member if member is not None else path)
+    stem, ext = os.path.splitext(name)
+    if ext.lower() in COMPRESSED_OPENERS:
+        stem, ext = os.path.splitext(stem)
+    return stem if ext.lower() in CSV_SUFFIXES or not ext else stem + ext
+
+
+def is_supported(name: str) -> bool:
+    lower = name.lower()
+    for suffix in COMPRESSED_OPENERS:
+        if lower.endswith(suffix):
+            lower = lower[:-len(suffix)]
+            break
+    else:
+        if lower.endswith(".zip"):
+            return True
+    return lower.endswith(".csv")
+
+
+def zip_members(archive: str) -> list:
+    """"archive|member" paths of the CSV members of a zip, in archive order."""
+    with zipfile.ZipFile(archive) as zf:
+        return [
+            f"{archive}{MEMBER_SEP}{info.filename}"
+            for info in zf.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(CSV_SUFFIXES)
+            and not os.path.basename(info.filename).startswith(".")
+        ]
+
+
+def expand(paths) -> list:
+    """Replace .zip archives by their CSV members."""
+    out = []
+    for path in paths:
+        if path.lower().endswith(".zip") and split_member(path)[1] is None:
+            out.extend(zip_members(path))
+        else:
+            out.append(path)
+    return out
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental sync of a re-exported CSV into existing notes.
+
+SyncIndex loads key -> (note id, hash of each field, hash of the tags) for
+one note type (optionally one deck) with a single query, keyed on one
+field. During the streaming import every mapped row (see mapping.py) is
+looked up by its key field: unknown keys become new notes, rows whose
+fields or tags differ update the existing note, and identical rows cost
+nothing. Notes whose key never shows up in the file can be tagged
+afterwards.
+"""
+
+from .duplicates import DUPLICATE_IN_FILE, NEW
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+NO_KEY = "no_key"
+
+MISSING_TAG = "missing-from-csv"
+FIELD_SEPARATOR = "\x1f"
+
+
+def _tags_hash(tags) -> int:
+    return hash(" ".join(sorted(t for t in tags if t != MISSING_TAG)))
+
+
+class SyncIndex:
+    def __init__(self, col, notetype_id, key_field: int = 0, deck_id=None):
+        if deck_id is None:
+            rows = col.db.all(
+                "select n.id, n.flds, n.tags from notes n where n.mid = ?", notetype_id
+            )
+        else:
+            rows = col.db.all(
+                "select distinct n.id, n.flds, n.tags from notes n "
+                "join cards c on c.nid = n.id where n.mid = ? and c.did = ?",
+                notetype_id,
+                deck_id,
+            )
+        self.key_field = key_field
+        self.existing = {}  # key -> (note id, field hashes, tags hash, tagged missing)
+        for nid, flds, tags in rows:
+            fields = flds.split(FIELD_SEPARATOR)
+            if key_field >= len(fields):
+                continue
+            key = fields[key_field].strip()
+            if key:
+                tags = tags.split()
+                self.existing.setdefault(
+                    key,
+                    (nid, tuple(map(hash, fields)), _tags_hash(tags), MISSING_TAG in tags),
+                )
+        self.seen = set()
+
+    def classify(self, fields, tags) -> tuple[str, int | None]:
+        """Return (NEW | CHANGED | UNCHANGED | DUPLICATE_IN_FILE | NO_KEY,
+        existing note id) for a mapped row; None fields are not compared."""
+        key_field = self.key_field
+        key = fields[key_field] if key_field < len(fields) else None
+        key = key.strip() if key else ""
+        if not key:
+            return NO_KEY, None
+        if key in self.seen:
+            return DUPLICATE_IN_FILE, None
+        self.seen.add(key)
+        existing = self.existing.get(key)
+        if existing is None:
+            return NEW, None
+        nid, field_hashes, tags_hash, _ = existing
+        # No tags leaves the note's tags alone, like fill_note
+        if tags and _tags_hash(tags) != tags_hash:
+            return CHANGED, nid
+        for value, old in zip(fields, field_hashes):
+            if value is not None and hash(value) != old:
+                return CHANGED, nid
+        return UNCHANGED, nid
+
+    def missing(self) -> list:
+        """Ids of indexed notes whose key was not in the file."""
+        seen = self.seen
+        return [e[0] for key, e in self.existing.items() if key not in seen]
+
+    def returned(self) -> list:
+        """Ids of notes tagged missing earlier whose key is back in the file."""
+        seen = self.seen
+        return [e[0] for key, e in self.existing.items() if e[3] and key in seen]
+
+
+def flag_missing(col, indexes) -> int:
+    """Tag notes missing from the file(s) and untag those that came back."""
+    missing, returned = set(), set()
+    for index in indexes:
+        missing.update(index.missing())
+        returned.update(index.returned())
+    missing -= returned
+    if returned:
+        col.tags.bulk_remove(list(returned), MISSING_TAG)
+    if missing:
+        col.tags.bulk_add(list(missing), MISSING_TAG)
+    return len(missing)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+Watch-folder manifest for automatic imports.
+
+A FolderWatch polls one folder for CSV files (anything sources.is_supported
+accepts) and reports the ones that are new or whose content changed since
+they were last imported. Polling stays cheap: the folder is only listed
+again when its own mtime moves (a file was added, removed or renamed), and
+each known file costs one stat call. Only a file whose size or mtime moved
+is hashed, so touching a file without changing it does not import it
+again. A file is reported once its size and mtime held still between two
+polls, so files that are still being written are left alone.
+
+The manifest (size, mtime and content hash per file) is kept in
+user_files/watch, one JSON file per profile and folder.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+
+from . import sources
+
+WATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_files", "watch")
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class Entry:
+    size: int
+    mtime_ns: int
+    hash: str
+
+
+class FolderWatch:
+    def __init__(self, folder: str, profile: str, directory: str = WATCH_DIR):
+        self.folder = os.path.abspath(folder)
+        key = hashlib.sha1(f"{profile}\0{self.folder}".encode("utf-8")).hexdigest()[:20]
+        self.manifest_path = os.path.join(directory, f"{key}.json")
+        self.entries = self._load()
+        self._dir_mtime = None
+        self._paths = []
+        self._settling = {}  # path -> (size, mtime) at the previous poll
+        self._pending = {}  # path -> Entry, reported but not yet marked done
+
+    def _load(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {path: Entry(**entry) for path, entry in data.items()}
+        except (OSError, ValueError, TypeError):
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({path: asdict(entry) for path, entry in self.entries.items()}, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _listing(self) -> list:
+        """CSV files in the folder; listed again only when the folder changed."""
+        mtime = os.stat(self.folder).st_mtime_ns
+        if mtime != self._dir_mtime:
+            with os.scandir(self.folder) as it:
+                self._paths = sorted(
+                    e.path for e in it if sources.is_supported(e.name) and e.is_file()
+                )
+            self._dir_mtime = mtime
+            present = set(self._paths)
+            gone = [path for path in self.entries if path not in present]
+            for path in gone:
+                del self.entries[path]
+            if gone:
+                self.save()
+        return self._paths
+
+    def poll(self) -> list:
+        """Paths that are new or changed and no longer being written."""
+        changed = []
+        touched = False
+        for path in self._listing():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed since the listing
+            stamp = (st.st_size, st.st_mtime_ns)
+            entry = self.entries.get(path)
+            if entry is not None and (entry.size, entry.mtime_ns) == stamp:
+                continue
+            if path in self._pending:
+                continue  # reported, import still running
+            if self._settling.get(path) != stamp:
+                self._settling[path] = stamp
+                continue
+            del self._settling[path]
+            try:
+                digest = content_hash(path)
+            except OSError:
+                continue
+            if entry is not None and entry.hash == digest:
+                # Touched or copied over with the same content
+                entry.size, entry.mtime_ns = stamp
+                touched = True
+                continue
+            self._pending[path] = Entry(*stamp, digest)
+            changed.append(path)
+        if touched:
+            self.save()
+        return changed
+
+    def done(self, paths):
+        """Record reported files as imported (or failed), so they are only
+        reported again once their content changes."""
+        for path in paths:
+            entry = self._pending.pop(path, None)
+            if entry is not None:
+                self.entries[path] = entry
+        self.save()
+
+    def baseline(self):
+        """Take the files already in the folder as imported."""
+        for path in self._listing():
+            try:
+                st = os.stat(path)
+                self.entries[path] = Entry(st.st_size, st.st_mtime_ns, content_hash(path))
+            except OSError:
+                continue
+        self.save()
+
+    def forget(self):
+        try:
+            os.remove(self.manifest_path)
+        except OSError:
+            pass